@@ -0,0 +1,230 @@
+"""
+Benchmarks the read path on generated documents of increasing size.
+
+    python -m benchmarks.bench_read [--sizes 1x4x25x8,2x10x50x8+4] [--repeat 3]
+                                    [--output results.jsonl] [--compare baseline.jsonl]
+
+Sizes are PAGESxGROUPSxLAYERSxPOINTS[+IMAGES[@BYTES]] (see benchmarks.generate).
+For every size each stage is measured in a fresh interpreter so peak memory is
+not inherited from earlier runs. Stages:
+
+    bplist.read            decoding the payload through the file-like decoder
+    bplist.read_buffer     decoding the payload in memory (what sketch.read uses)
+    converter.deserialize  converting a decoded payload and walking every layer
+    converter.deserialize_eager
+                           the same with mode="eager"
+    sketch.read            the whole path from file to walked document
+
+Peak memory is the growth of the process' peak RSS over the stage, measured from
+before any setup. The converter stages decode the payload first, outside the
+timed part; the peak reached by that decoding alone is reported as the setup
+peak, so the part above it is the converter's own.
+
+Results are printed as a table and appended as JSON lines to --output, tagged
+with the current commit, so runs can be compared across commits with --compare.
+"""
+from __future__ import print_function
+
+import argparse
+import io
+import json
+import os
+import platform
+import resource
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.generate import DocumentSize, write_document
+
+
+STAGES = ("bplist.read", "bplist.read_buffer", "converter.deserialize",
+          "converter.deserialize_eager", "sketch.read")
+DEFAULT_SIZES = ("1x4x25x8", "2x10x50x8+4@262144", "4x20x100x8+16@262144")
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+##############################################################
+#                  MEASUREMENT (CHILD PROCESS)               #
+##############################################################
+def _peak_rss_kb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def _walk(document):
+    """ Touches every page, layer and path point so lazily converted models are built """
+    count = 0
+    stack = list(document.pages)
+    while stack:
+        layer = stack.pop()
+        count += 1
+        stack.extend(getattr(layer, "layers", None) or ())
+        path = getattr(layer, "path", None)
+        if path is not None:
+            count += len(path.points)
+    return count
+
+
+def _object_count(payload):
+    return struct.unpack(">6xBBQQQ", bytes(payload[-32:]))[2]
+
+
+def _measure(stage, filename, repeat):
+    import sketch
+    from sketch import bplist, converter
+
+    payload = sketch._fetch_plist(filename)
+    setup = None
+    if stage in ("converter.deserialize", "converter.deserialize_eager"):
+        setup = lambda: bplist.read_buffer(payload)
+
+    # Taken before setup() decodes anything: ru_maxrss only ever grows, so a baseline
+    # taken after decoding would hide every stage whose peak is below the decoder's
+    baseline_kb = _peak_rss_kb()
+    setup_kb = 0
+    runs = []
+    for _ in range(repeat):
+        plist_data = setup() if setup else None
+        if setup and not runs:
+            setup_kb = _peak_rss_kb() - baseline_kb
+
+        start = time.time()
+        if stage == "bplist.read":
+            result = bplist.read(io.BytesIO(payload))
+        elif stage == "bplist.read_buffer":
+            result = bplist.read_buffer(payload)
+        elif stage == "converter.deserialize":
+            result = converter.deserialize(plist_data)
+            _walk(result)
+        elif stage == "converter.deserialize_eager":
+            result = converter.deserialize(plist_data, mode="eager")
+            _walk(result)
+        elif stage == "sketch.read":
+            result = sketch.read(filename)
+            _walk(result)
+        else:
+            raise ValueError("Unknown stage {0}".format(stage))
+        runs.append(time.time() - start)
+        del result, plist_data
+
+    objects = _object_count(payload)
+    wall = min(runs)
+    return {
+        "stage": stage,
+        "wall": wall,
+        "runs": runs,
+        "objects": objects,
+        "objects_per_sec": objects / wall if wall else None,
+        "peak_rss_kb": _peak_rss_kb() - baseline_kb,
+        "setup_peak_rss_kb": setup_kb,
+        "payload_bytes": len(payload),
+    }
+
+
+##############################################################
+#                  DRIVER                                    #
+##############################################################
+def _commit():
+    try:
+        with open(os.devnull, "w") as devnull:
+            return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                           cwd=_ROOT, stderr=devnull).decode("ascii").strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _document(size, workdir):
+    filename = os.path.join(workdir, "bench_{0}.sketch".format(size.name.replace("@", "_").replace("+", "_")))
+    if not os.path.exists(filename):
+        write_document(filename, size)
+    return filename
+
+
+def _run_stage(stage, filename, repeat):
+    output = subprocess.check_output([sys.executable, "-m", "benchmarks.bench_read",
+                                      "--measure", stage, filename, "--repeat", str(repeat)], cwd=_ROOT)
+    return json.loads(output.decode("utf-8").strip().splitlines()[-1])
+
+
+def _load_results(filename):
+    results = {}
+    with open(filename) as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                # Later records for the same size and stage win
+                results[(record["size"], record["stage"])] = record
+    return results
+
+
+def _print_table(records, baseline=None):
+    header = "{0:<24} {1:<27} {2:>10} {3:>14} {4:>12} {5:>12}".format("size", "stage", "wall (s)", "objects/s",
+                                                                     "peak (KB)", "setup (KB)")
+    if baseline is not None:
+        header += " {0:>9}".format("vs base")
+    print(header)
+    print("-" * len(header))
+    for record in records:
+        line = "{0:<24} {1:<27} {2:>10.4f} {3:>14.0f} {4:>12} {5:>12}".format(
+            record["size"], record["stage"], record["wall"], record["objects_per_sec"] or 0, record["peak_rss_kb"],
+            record.get("setup_peak_rss_kb", "-"))
+        if baseline is not None:
+            base = baseline.get((record["size"], record["stage"]))
+            line += " {0:>8.2f}x".format(base["wall"] / record["wall"]) if base and record["wall"] else " {0:>9}".format("-")
+        print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks sketch's read path on generated documents")
+    parser.add_argument("--sizes", default=",".join(DEFAULT_SIZES),
+                        help="Comma separated PAGESxGROUPSxLAYERSxPOINTS[+IMAGES[@BYTES]] sizes")
+    parser.add_argument("--stages", default=",".join(STAGES), help="Comma separated stages to run")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per stage; the fastest is reported")
+    parser.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), "sketch-bench"),
+                        help="Where generated documents are kept between runs")
+    parser.add_argument("--output", help="Append results to this JSON lines file")
+    parser.add_argument("--compare", help="JSON lines file of an earlier run to compare against")
+    parser.add_argument("--label", help="Free-form label stored with the results")
+    parser.add_argument("--measure", nargs=2, metavar=("STAGE", "FILE"), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.measure:
+        print(json.dumps(_measure(args.measure[0], args.measure[1], args.repeat)))
+        return
+
+    if not os.path.isdir(args.workdir):
+        os.makedirs(args.workdir)
+
+    commit = _commit()
+    baseline = _load_results(args.compare) if args.compare else None
+    records = []
+    for spec in args.sizes.split(","):
+        size = DocumentSize.parse(spec.strip())
+        filename = _document(size, args.workdir)
+        for stage in args.stages.split(","):
+            record = _run_stage(stage.strip(), filename, args.repeat)
+            record.update({
+                "size": size.name,
+                "layers": size.layer_count,
+                "commit": commit,
+                "label": args.label,
+                "python": platform.python_version(),
+                "timestamp": time.time(),
+            })
+            records.append(record)
+
+    _print_table(records, baseline)
+
+    if args.output:
+        with open(args.output, "a") as f:
+            for record in records:
+                f.write(json.dumps(record, sort_keys=True) + "\n")
+
+
+if __name__ == "__main__":
+    main()
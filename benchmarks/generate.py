@@ -0,0 +1,232 @@
+"""
+Generates synthetic Sketch documents of configurable size.
+
+Documents are MSArchiver binary plists written into the `payload` table of a
+SQLite database, laid out like the files Sketch itself writes, so that they
+load through sketch.read(). The layer tree is
+
+    pages x groups (MSLayerGroup) x shape layers (MSShapePathLayer) x path points
+
+plus `images` embedded bitmaps in the document's MSImageCollection.
+"""
+from __future__ import unicode_literals
+
+import hashlib
+import io
+import os
+import random
+import sqlite3
+import uuid
+
+from sketch import bplist
+
+
+SHAPE_CLASSES = ("MSRectangleShape", "MSOvalShape", "MSStarShape",
+                 "MSPolygonShape", "MSTriangleShape", "MSShapePathLayer")
+
+
+class DocumentSize(object):
+    """ The dimensions of a generated document """
+    def __init__(self, pages, groups, layers, points, images=0, image_bytes=64 * 1024):
+        self.pages = pages
+        self.groups = groups
+        self.layers = layers
+        self.points = points
+        self.images = images
+        self.image_bytes = image_bytes
+
+    @classmethod
+    def parse(cls, spec):
+        """
+        Parses "PAGESxGROUPSxLAYERSxPOINTS[+IMAGES[@BYTES]]", e.g. "2x10x50x8+4@262144"
+        """
+        images, image_bytes = 0, 64 * 1024
+        if "+" in spec:
+            spec, image_spec = spec.split("+", 1)
+            if "@" in image_spec:
+                image_spec, image_bytes = image_spec.split("@", 1)
+            images = int(image_spec)
+        pages, groups, layers, points = (int(n) for n in spec.split("x"))
+        return cls(pages, groups, layers, points, images, int(image_bytes))
+
+    @property
+    def name(self):
+        name = "{0}x{1}x{2}x{3}".format(self.pages, self.groups, self.layers, self.points)
+        if self.images:
+            name += "+{0}@{1}".format(self.images, self.image_bytes)
+        return name
+
+    @property
+    def layer_count(self):
+        """ Shape layers in the document, not counting groups and pages """
+        return self.pages * self.groups * self.layers
+
+    def __repr__(self):
+        return "<DocumentSize {0}>".format(self.name)
+
+
+class _Archive(object):
+    """ Builds an MSArchiver object table """
+
+    def __init__(self):
+        self.objects = ["$null"]
+        self._classes = {}
+        self._strings = {}
+
+    def add(self, obj):
+        self.objects.append(obj)
+        return bplist.UID(len(self.objects) - 1)
+
+    def string(self, value):
+        if value not in self._strings:
+            self._strings[value] = self.add(value)
+        return self._strings[value]
+
+    def reserve(self):
+        """ Reserves a slot for an object that is filled in later with instance(..., into=uid) """
+        return self.add(None)
+
+    def instance(self, classname, fields, superclasses=("MSModelObject",), into=None):
+        if classname not in self._classes:
+            self._classes[classname] = self.add({
+                "$classname": classname,
+                "$classes": [classname] + list(superclasses) + ["NSObject"],
+            })
+        fields = dict(fields)
+        fields["$class"] = self._classes[classname]
+        if into is None:
+            return self.add(fields)
+        self.objects[into.value] = fields
+        return into
+
+    def ms_array(self, items):
+        ns_array = dict(("NS.object.{0}".format(i), item) for i, item in enumerate(items))
+        ns_array_uid = self.instance("NSMutableArray", ns_array, superclasses=("NSArray",))
+        return self.instance("MSArray", {"array_do": ns_array_uid})
+
+    def rect(self, x, y, width, height):
+        return self.instance("MSRect", {"x": float(x), "y": float(y),
+                                        "width": float(width), "height": float(height),
+                                        "constrainProportions": False})
+
+    def object_id(self):
+        return self.string("{0}".format(uuid.uuid4()).upper())
+
+    def payload(self):
+        top = {
+            "$archiver": "MSArchiver",
+            "$version": 100000,
+            "$top": {"root": bplist.UID(1)},
+            "$objects": self.objects,
+        }
+        f = io.BytesIO()
+        bplist.write(top, f)
+        return f.getvalue()
+
+
+def _layer_fields(archive, name, frame):
+    return {
+        "name": archive.string(name),
+        "frame": frame,
+        "style": archive.instance("MSStyle", {"miterLimit": 10}),
+        "rotation": 0.0,
+        "isVisible": True,
+        "isLocked": False,
+        "isFlippedHorizontal": False,
+        "isFlippedVertical": False,
+        "do_objectID": archive.object_id(),
+    }
+
+
+def _point(rng):
+    return "{{{0:.6g}, {1:.6g}}}".format(rng.random(), rng.random())
+
+
+def _shape_layer(archive, rng, index, points):
+    curve_points = []
+    for _ in range(points):
+        curve_points.append(archive.instance("MSCurvePoint", {
+            "point": archive.string(_point(rng)),
+            "curveFrom": archive.string(_point(rng)),
+            "curveTo": archive.string(_point(rng)),
+            "curveMode": rng.randint(1, 4),
+            "cornerRadius": 0.0,
+            "hasCurveFrom": True,
+            "hasCurveTo": True,
+        }))
+    path = archive.instance("MSShapePath", {"isClosed": True, "points": archive.ms_array(curve_points)})
+
+    classname = SHAPE_CLASSES[index % len(SHAPE_CLASSES)]
+    fields = _layer_fields(archive, "{0} {1}".format(classname, index),
+                           archive.rect(rng.uniform(0, 800), rng.uniform(0, 800),
+                                        rng.uniform(10, 200), rng.uniform(10, 200)))
+    fields.update({"path": path, "booleanOperation": -1, "edited": False})
+    return archive.instance(classname, fields, superclasses=("MSShapePathLayer", "MSLayer"))
+
+
+def _images(archive, rng, size):
+    keys, values = [], []
+    for _ in range(size.images):
+        # A random block repeated to size keeps generation fast for large bitmaps
+        block = bytes(bytearray(rng.getrandbits(8) for _ in range(min(size.image_bytes, 4096))))
+        data = (block * (size.image_bytes // max(len(block), 1) + 1))[:size.image_bytes]
+        sha1 = hashlib.sha1(data)
+        keys.append(archive.string("{0}".format(sha1.hexdigest())))
+        values.append(archive.instance("MSImageData", {"data": archive.add(data),
+                                                       "sha1": archive.add(sha1.digest())}))
+    images = archive.instance("NSMutableDictionary", {"NS.keys": keys, "NS.objects": values},
+                              superclasses=("NSDictionary",))
+    return archive.instance("MSImageCollection", {"images": images})
+
+
+def generate_payload(size, seed=0):
+    """ Returns the MSArchiver bplist payload of a document of the given DocumentSize """
+    rng = random.Random(seed)
+    archive = _Archive()
+    document = archive.reserve()  # The root must be object 1
+
+    empty_container = {"objects": archive.ms_array([])}
+    pages = []
+    for p in range(size.pages):
+        groups = []
+        for g in range(size.groups):
+            layers = [_shape_layer(archive, rng, l, size.points) for l in range(size.layers)]
+            fields = _layer_fields(archive, "Group {0}".format(g), archive.rect(0, 0, 1000, 1000))
+            fields["layers"] = archive.ms_array(layers)
+            groups.append(archive.instance("MSLayerGroup", fields, superclasses=("MSLayer",)))
+
+        fields = _layer_fields(archive, "Page {0}".format(p + 1), archive.rect(0, 0, 0, 0))
+        fields.update({
+            "layers": archive.ms_array(groups),
+            "horizontalRulerData": archive.instance("MSRulerData", {"base": 0}),
+            "verticalRulerData": archive.instance("MSRulerData", {"base": 0}),
+        })
+        pages.append(archive.instance("MSPage", fields, superclasses=("MSLayerGroup", "MSLayer")))
+
+    document_fields = {
+        "images": _images(archive, rng, size),
+        "pages": archive.ms_array(pages),
+        "currentPageIndex": 0,
+        "enableSliceInteraction": True,
+        "enableLayerInteraction": True,
+        "layerStyles": archive.instance("MSSharedLayerStyleContainer", empty_container),
+        "layerSymbols": archive.instance("MSSharedLayerContainer", empty_container),
+        "layerTextStyles": archive.instance("MSSharedLayerTextStyleContainer", empty_container),
+        "do_objectID": archive.object_id(),
+    }
+    archive.instance("MSDocumentData", document_fields, into=document)
+    return archive.payload()
+
+
+def write_document(filename, size, seed=0):
+    """ Writes a Sketch document of the given DocumentSize to filename """
+    payload = generate_payload(size, seed)
+    if os.path.exists(filename):
+        os.remove(filename)
+    conn = sqlite3.connect(filename)
+    conn.execute("CREATE TABLE metadata (name text, value blob)")
+    conn.execute("CREATE TABLE payload (name text, value blob)")
+    conn.execute("INSERT INTO payload VALUES ('main', ?)", (sqlite3.Binary(payload),))
+    conn.commit()
+    conn.close()
+    return filename
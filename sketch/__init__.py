@@ -1,35 +1,130 @@
+import errno
+import os
 import sqlite3
-import io
+import sys
+
+try:
+    from urllib.request import pathname2url
+except ImportError:
+    from urllib import pathname2url
 
 from sketch import (
     bplist,
     converter
 )
+from sketch.cache import DocumentCache
+from sketch.parallel import (
+    ReadResult,
+    read_many
+)
+from sketch.report import (
+    ReadReport,
+    stage
+)
+
+
+# Size of each incremental read from the payload blob
+_BLOB_CHUNK_SIZE = 1 << 20
+
+
+def _connect(filename):
+    """
+    Opens the Sketch doc. On Python 3.4+ it is opened read-only and immutable,
+    which skips locking and change detection since nothing writes to it while we
+    read. Python 2's sqlite3 cannot pass URI filenames, so there it is opened
+    with the default flags, which would create an empty database for a missing
+    file: a missing file is reported before connecting.
+    """
+    if not os.path.isfile(filename):
+        raise IOError(errno.ENOENT, "No such Sketch document", filename)
+    if sys.version_info >= (3, 4):
+        uri = "file:{0}?mode=ro&immutable=1".format(pathname2url(os.path.abspath(filename)))
+        return sqlite3.connect(uri, uri=True)
+    return sqlite3.connect(filename)
 
 
 def _fetch_plist(filename):
-    """ Retrieves the embedded plist from the Sketch doc """
-    conn = sqlite3.connect(filename)
-    c = conn.cursor()
+    """
+    Retrieves the embedded plist payload from the Sketch doc.
+    With SQLite's incremental blob I/O (Connection.blobopen, Python 3.11+) the
+    payload is read in chunks into a single buffer, so the only full copy held is
+    the one returned. Elsewhere, Python 2 included, it is fetched in one piece.
+    """
+    conn = _connect(filename)
+    try:
+        c = conn.cursor()
+        if hasattr(conn, "blobopen"):
+            c.execute("select rowid from payload where name='main'")
+            rowid = c.fetchone()[0]
+            with conn.blobopen("payload", "value", rowid, readonly=True) as blob:
+                payload = bytearray(len(blob))
+                view = memoryview(payload)
+                for start in range(0, len(payload), _BLOB_CHUNK_SIZE):
+                    chunk = blob.read(_BLOB_CHUNK_SIZE)
+                    view[start:start + len(chunk)] = chunk
+            return payload
 
-    c.execute("select value from payload where name='main'")
-    payload = c.fetchone()[0]
-    plist_obj = io.BytesIO(payload)
+        c.execute("select value from payload where name='main'")
+        return c.fetchone()[0]
+    finally:
+        conn.close()
 
-    conn.close()
 
-    return plist_obj
+def _parse_plist(plist_obj, lazy=False, copy_data=False, mode="lazy", report=None,
+                 max_nesting=None, max_objects=None, **filters):
+    """
+    Parses Sketch's raw plist info into an MSDocumentData object.
+    plist_obj is either the raw payload, which is decoded in place, or a file-like object
+    """
+    budgets = dict(max_depth=max_nesting, max_objects=max_objects)
+    decode_stats = report.decoding if report is not None else None
+    conversion_stats = report.conversion if report is not None else None
 
+    with stage(report, "decode"):
+        if hasattr(plist_obj, "read"):
+            if lazy:
+                raise ValueError("Lazy parsing needs the raw payload rather than a file-like object")
+            plist_data = bplist.read(plist_obj, stats=decode_stats, **budgets)
+        else:
+            plist_data = bplist.read_buffer(plist_obj, stats=decode_stats, lazy=lazy, copy_data=copy_data, **budgets)
 
-def _parse_plist(plist_obj):
-    """ Parses Sketch's raw plist info into an MSDocumentData object """
-    plist_data = bplist.read(plist_obj)
-    return converter.deserialize(plist_data)
+    with stage(report, "convert"):
+        return converter.deserialize(plist_data, stats=conversion_stats, mode=mode, **filters)
 
 
-def read(filename):
-    """ Reads and parses a Sketch document into an MSDocumentData object """
+def read(filename, lazy=False, copy_data=False, cache=None, mode="lazy",
+         pages=None, layer_classes=None, max_depth=None, report=None,
+         max_nesting=None, max_objects=None):
+    """
+    Reads and parses a Sketch document into an MSDocumentData object.
+    With lazy=True, archived objects are only decoded and converted once they
+    are accessed, e.g. reading document.pages[0].name leaves other pages untouched.
+    Embedded binary data (e.g. images) is returned as memoryview slices of the
+    payload unless copy_data=True.
+    mode is passed on to converter.deserialize(): with mode="eager" the whole
+    model tree is built up front and keeps no reference to the archive.
+    pages, layer_classes and max_depth select parts of the document, see
+    converter.deserialize(); with lazy=True the rest is not even decoded.
+    max_nesting and max_objects bound the bplist decoder (its max_depth and
+    max_objects, see bplist.read_buffer()) for untrusted payloads: exceeding either,
+    or a payload referring outside itself, raises bplist.DataIntegrityError.
+    With a DocumentCache, the document is returned from the cache when the file's
+    payload has been parsed with the same filters before, see DocumentCache.read().
+    Pass a ReadReport as `report` to have it filled in with stage timings and counters.
+    """
     assert isinstance(filename, basestring)
 
-    plist_obj = _fetch_plist(filename)
-    return _parse_plist(plist_obj)
+    if report is not None and report.filename is None:
+        report.filename = filename
+
+    filters = dict(pages=pages, layer_classes=layer_classes, max_depth=max_depth)
+    budgets = dict(max_nesting=max_nesting, max_objects=max_objects)
+
+    if cache is not None:
+        with stage(report, "cache"):
+            return cache.read(filename, lazy=lazy, mode=mode, **dict(filters, **budgets))
+
+    with stage(report, "fetch"):
+        plist_obj = _fetch_plist(filename)
+    return _parse_plist(plist_obj, lazy=lazy, copy_data=copy_data, mode=mode, report=report,
+                        **dict(filters, **budgets))
@@ -3,6 +3,13 @@ import os
 import struct
 import datetime
 
+import numpy as np
+
+try:
+    from collections.abc import Mapping, Sequence
+except ImportError:
+    from collections import Mapping, Sequence
+
 
 class DataIntegrityError(Exception):
     pass
@@ -19,9 +26,122 @@ class UID:
         return self.__repr__()
 
 
+class DecodeStats(object):
+    """
+    Counters describing a single read. Pass an instance as `stats` to read()
+    or read_buffer() to have it filled in.
+    """
+    def __init__(self):
+        # Objects actually decoded from the payload
+        self.objects_decoded = 0
+        # References served from the object cache instead of being decoded again
+        self.decodes_avoided = 0
+        # Strings at different object indexes that were found equal and shared
+        self.strings_shared = 0
+        # Objects in the payload by type (the high nibble of their marker byte), e.g. {"dict": 120}
+        self.object_types = {}
+
+    def count_object_types(self, markers):
+        """ Adds the objects with the given marker bytes to object_types """
+        counts = np.bincount(np.asarray(markers, dtype=np.uint8) >> 4, minlength=16)
+        for object_type, count in enumerate(counts):
+            if count:
+                name = _OBJECT_TYPE_NAMES.get(object_type, "0x{0:x}".format(object_type))
+                self.object_types[name] = self.object_types.get(name, 0) + int(count)
+
+    def __repr__(self):
+        return "<DecodeStats objects_decoded: {0} decodes_avoided: {1} strings_shared: {2}>".format(
+            self.objects_decoded, self.decodes_avoided, self.strings_shared)
+
+
+class _ObjectCache(object):
+    """ Decoded objects of a single read, keyed by their index in the offset table """
+    def __init__(self, object_count, stats=None):
+        self.objects = [_MISSING] * object_count
+        self.stats = stats if stats is not None else DecodeStats()
+
+
+_MISSING = object()
+
+_OBJECT_TYPE_NAMES = {0x0: "singleton", 0x1: "int", 0x2: "real", 0x3: "date", 0x4: "data", 0x5: "ascii",
+                      0x6: "utf16", 0x8: "uid", 0xA: "array", 0xC: "set", 0xD: "dict"}
+
+
+class LazyArray(Sequence):
+    """
+    An array (or set) returned by read_buffer(..., lazy=True). Only the object
+    references are held, as a compact integer array; elements are decoded on first
+    access and memoized by the decoder.
+    """
+    def __init__(self, decoder, refs):
+        self._decoder = decoder
+        self._refs = refs
+
+    def __len__(self):
+        return len(self._refs)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._decoder.decode(ref) for ref in self._refs[index].tolist()]
+        return self._decoder.decode(self._refs.item(index))
+
+    def __iter__(self):
+        decode = self._decoder.decode
+        for ref in self._refs.tolist():
+            yield decode(ref)
+
+    def __repr__(self):
+        return "<LazyArray count: {0}>".format(len(self))
+
+
+class LazyDict(Mapping):
+    """
+    A dictionary returned by read_buffer(..., lazy=True). Keys are decoded the
+    first time the dictionary is searched; values are decoded on first access
+    and memoized by the decoder.
+    """
+    def __init__(self, decoder, key_refs, value_refs):
+        self._decoder = decoder
+        self._key_refs = key_refs
+        self._value_refs = value_refs
+        self._index = None
+
+    def _value_ref(self, key):
+        if self._index is None:
+            decode = self._decoder.decode
+            self._index = dict((decode(key_ref), value_ref)
+                               for key_ref, value_ref in zip(self._key_refs.tolist(), self._value_refs.tolist()))
+        return self._index[key]
+
+    def __getitem__(self, key):
+        return self._decoder.decode(self._value_ref(key))
+
+    def __contains__(self, key):
+        try:
+            self._value_ref(key)
+        except KeyError:
+            return False
+        return True
+
+    def __len__(self):
+        return len(self._key_refs)
+
+    def __iter__(self):
+        decode = self._decoder.decode
+        for key_ref in self._key_refs.tolist():
+            yield decode(key_ref)
+
+    def __repr__(self):
+        return "<LazyDict count: {0}>".format(len(self))
+
+
 ##############################################################
 #                  DECODING FUNCTIONS                        #
 ##############################################################
+_UINT_DTYPES = {1: np.dtype(">u1"), 2: np.dtype(">u2"), 4: np.dtype(">u4"), 8: np.dtype(">u8")}
+_UINT24_DTYPE = np.dtype([("high", ">u1"), ("low", ">u2")])
+
+
 def __decode_multibyte_int(b, signed=True):
     if len(b) == 1:
         fmt = ">B"  # Always unsigned?
@@ -45,6 +165,23 @@ def __decode_multibyte_int(b, signed=True):
         return struct.unpack(fmt.upper(), b)[0]
 
 
+def decode_uint_array(b, offset, size, count):
+    """
+    Decodes `count` consecutive big-endian unsigned ints of `size` bytes, starting at
+    `offset`, into a numpy array. Used for the offset table and collection references.
+    """
+    if count == 0:
+        return np.zeros(0, dtype=np.uint8)
+    if size == 3:
+        triples = np.frombuffer(b, dtype=_UINT24_DTYPE, count=count, offset=offset)
+        return (triples["high"].astype(np.uint32) << 16) | triples["low"]
+    try:
+        dtype = _UINT_DTYPES[size]
+    except KeyError:
+        raise DataIntegrityError("Cannot decode multibyte int of length {0}".format(size))
+    return np.frombuffer(b, dtype=dtype, count=count, offset=offset)
+
+
 def __decode_float(b, signed=True):
     if len(b) == 4:
         fmt = ">f"
@@ -59,7 +196,19 @@ def __decode_float(b, signed=True):
         return struct.unpack(fmt.upper(), b)[0]
 
 
-def __decode_object(f, offset, collection_offset_size, offset_table):
+def __decode_ref(f, ref, collection_offset_size, offset_table, cache):
+    # Each object is decoded once per read and then shared by every reference to it
+    result = cache.objects[ref]
+    if result is _MISSING:
+        result = __decode_object(f, offset_table.item(ref), collection_offset_size, offset_table, cache)
+        cache.objects[ref] = result
+        cache.stats.objects_decoded += 1
+    else:
+        cache.stats.decodes_avoided += 1
+    return result
+
+
+def __decode_object(f, offset, collection_offset_size, offset_table, cache):
     # Move to offset and read type
     f.seek(offset)
 
@@ -88,11 +237,11 @@ def __decode_object(f, offset, collection_offset_size, offset_table):
     elif type_byte & 0xF0 == 0x80:          # UID     1000 nnnn
         return read_uid(f, type_byte)
     elif type_byte & 0xF0 == 0xA0:          # Array   1010 nnnn
-        return read_array(f, type_byte, collection_offset_size, offset_table)
+        return read_array(f, type_byte, collection_offset_size, offset_table, cache)
     elif type_byte & 0xF0 == 0xC0:          # Set     1010 nnnn
-        return read_set(f, type_byte, collection_offset_size, offset_table)
+        return read_set(f, type_byte, collection_offset_size, offset_table, cache)
     elif type_byte & 0xF0 == 0xD0:          # Dict    1011 nnnn
-        return read_dict(f, type_byte, collection_offset_size, offset_table)
+        return read_dict(f, type_byte, collection_offset_size, offset_table, cache)
 
 
 ##############################################################
@@ -176,7 +325,11 @@ def read_uid(f, type_byte):
     return UID(__decode_multibyte_int(uid_bytes, signed=False))
 
 
-def read_array(f, type_byte, collection_offset_size, offset_table):
+def read_refs(f, ref_size, count):
+    return decode_uint_array(f.read(ref_size * count), 0, ref_size, count)
+
+
+def read_array(f, type_byte, collection_offset_size, offset_table, cache):
     if type_byte & 0x0F != 0x0F:
         # length in 4 lsb
         array_count = type_byte & 0x0F
@@ -184,13 +337,11 @@ def read_array(f, type_byte, collection_offset_size, offset_table):
         int_type_byte = verify_next_byte_int(f)
         array_count = read_int(f, int_type_byte, signed=False)
 
-    array_refs = []
-    for i in range(array_count):
-        array_refs.append(__decode_multibyte_int(f.read(collection_offset_size), False))
-    return [__decode_object(f, offset_table[obj_ref], collection_offset_size, offset_table) for obj_ref in array_refs]
+    array_refs = read_refs(f, collection_offset_size, array_count).tolist()
+    return [__decode_ref(f, obj_ref, collection_offset_size, offset_table, cache) for obj_ref in array_refs]
 
 
-def read_set(f, type_byte, collection_offset_size, offset_table):
+def read_set(f, type_byte, collection_offset_size, offset_table, cache):
     if type_byte & 0x0F != 0x0F:
         # length in 4 lsb
         set_count = type_byte & 0x0F
@@ -198,13 +349,11 @@ def read_set(f, type_byte, collection_offset_size, offset_table):
         int_type_byte = verify_next_byte_int(f)
         set_count = read_int(f, int_type_byte, signed=False)
 
-    set_refs = []
-    for i in range(set_count):
-        set_refs.append(__decode_multibyte_int(f.read(collection_offset_size), False))
-    return [__decode_object(f, offset_table[obj_ref], collection_offset_size, offset_table) for obj_ref in set_refs]
+    set_refs = read_refs(f, collection_offset_size, set_count).tolist()
+    return [__decode_ref(f, obj_ref, collection_offset_size, offset_table, cache) for obj_ref in set_refs]
 
 
-def read_dict(f, type_byte, collection_offset_size, offset_table):
+def read_dict(f, type_byte, collection_offset_size, offset_table, cache):
     if type_byte & 0x0F != 0x0F:
         # length in 4 lsb
         dict_count = type_byte & 0x0F
@@ -212,47 +361,472 @@ def read_dict(f, type_byte, collection_offset_size, offset_table):
         int_type_byte = verify_next_byte_int(f)
         dict_count = read_int(f, int_type_byte, signed=False)
 
-    key_refs = []
-
-    for i in range(dict_count):
-        key_refs.append(__decode_multibyte_int(f.read(collection_offset_size), False))
-    value_refs = []
-    for i in range(dict_count):
-        value_refs.append(__decode_multibyte_int(f.read(collection_offset_size), False))
+    refs = read_refs(f, collection_offset_size, dict_count * 2).tolist()
+    key_refs = refs[:dict_count]
+    value_refs = refs[dict_count:]
 
     dict_result = {}
     for i in range(dict_count):
-        key = __decode_object(f, offset_table[key_refs[i]], collection_offset_size, offset_table)
-        val = __decode_object(f, offset_table[value_refs[i]], collection_offset_size, offset_table)
+        key = __decode_ref(f, key_refs[i], collection_offset_size, offset_table, cache)
+        val = __decode_ref(f, value_refs[i], collection_offset_size, offset_table, cache)
         dict_result[key] = val
     return dict_result
 
 
+##############################################################
+#                  BUFFER DECODING                           #
+##############################################################
+_PY2 = sys.version_info[0] < 3
+
+_UINT8 = struct.Struct(">B")
+_TRAILER = struct.Struct(">6xBBQQQ")
+_TRAILER_SIZE = 32
+
+# Precompiled unpackers, keyed by byte width
+_UINT_STRUCTS = {1: struct.Struct(">B"), 2: struct.Struct(">H"), 4: struct.Struct(">I"), 8: struct.Struct(">Q")}
+# Mirrors __decode_multibyte_int(signed=True): single bytes are always unsigned
+_INT_STRUCTS = {1: struct.Struct(">B"), 2: struct.Struct(">h"), 4: struct.Struct(">i"), 8: struct.Struct(">q")}
+_FLOAT_STRUCTS = {4: struct.Struct(">f"), 8: struct.Struct(">d")}
+
+_DATE_EPOCH = datetime.datetime(2001, 1, 1)
+
+
+if _PY2:
+    def _decode_text(chunk, encoding):
+        return chunk.decode(encoding)
+
+    def _intern(text):
+        # intern() only accepts str, and decoded strings stay unicode as they always
+        # were, so strings are only shared within a document (see _BufferDecoder)
+        return text
+else:
+    def _decode_text(chunk, encoding):
+        return str(chunk, encoding)
+
+    _intern = sys.intern
+
+
+def _unpack_uint(buf, pos, size):
+    if size == 3:
+        high, low = struct.unpack_from(">BH", buf, pos)
+        return (high << 16) | low
+    try:
+        return _UINT_STRUCTS[size].unpack_from(buf, pos)[0]
+    except KeyError:
+        raise DataIntegrityError("Cannot decode multibyte int of length {0}".format(size))
+
+
+class _BufferDecoder(object):
+    """
+    Decodes a binary property list held entirely in memory. Objects are located
+    by index arithmetic on the payload rather than by seeking a file, and the
+    type byte of each object selects its reader from a 256-entry dispatch table.
+
+    Containers are filled from an explicit stack instead of by recursion, so the
+    nesting depth of the archive is bounded only by `max_depth`. `max_objects`
+    caps the number of objects decoded. Exceeding either raises DataIntegrityError,
+    as do references and offsets outside the payload.
+
+    Data objects are memoryview slices of the payload unless `copy_data` is set.
+
+    Decoded strings are shared per document: each string object is decoded once
+    (by object index) and equal strings share a single instance. On Python 3 that
+    instance is also interned with sys.intern(), so equal strings are shared
+    across documents too. Python 2's intern() only takes str and decoded strings
+    are unicode, so there sharing stops at the document.
+    """
+
+    def __init__(self, data, stats=None, lazy=False, max_depth=None, max_objects=None, copy_data=False):
+        if _PY2 and isinstance(data, memoryview):
+            data = data.tobytes()
+        self._data = data
+        self._view = memoryview(data)
+        self._copy_data = copy_data
+        self._strings = {}
+
+        if len(data) < 8 + _TRAILER_SIZE or data[:8] != b"bplist00":
+            raise DataIntegrityError("Bad file header")
+
+        offset_int_size, self._ref_size, object_count, self._top_object, offset_table_offset = \
+            _TRAILER.unpack_from(data, len(data) - _TRAILER_SIZE)
+        end = self._end = len(data) - _TRAILER_SIZE
+        if offset_table_offset + offset_int_size * object_count > end:
+            raise DataIntegrityError("Offset table runs past the end of the payload")
+        if self._top_object >= object_count:
+            raise DataIntegrityError("Top object {0} is not one of the {1} objects".format(self._top_object, object_count))
+
+        self._offset_table = decode_uint_array(data, offset_table_offset, offset_int_size, object_count)
+        if self._offset_table.max() >= end:
+            raise DataIntegrityError("Object offset past the end of the payload")
+
+        self._cache = _ObjectCache(object_count, stats)
+        self.stats = self._cache.stats
+        if stats is not None:
+            stats.count_object_types(np.frombuffer(data, dtype=np.uint8)[self._offset_table])
+        self._dispatch = _LAZY_DISPATCH if lazy else _BUFFER_DISPATCH
+
+        self._max_depth = max_depth if max_depth is not None else sys.maxsize
+        self._max_objects = max_objects if max_objects is not None else sys.maxsize
+        # Containers still being filled: [container, refs, next index, is_dict, pending key]
+        self._stack = []
+
+    def decode(self, ref=None):
+        """
+        Decodes the object at index `ref` of the offset table (the top object by default).
+        Each object is decoded once per decoder and then shared by every reference to it.
+        """
+        if ref is None:
+            ref = self._top_object
+        result = self._decode_ref(ref)
+        if self._stack:
+            self._fill_containers()
+        return result
+
+    def _decode_ref(self, ref):
+        """ Decodes a single object. Containers come back empty, with a frame pushed to fill them """
+        objects = self._cache.objects
+        try:
+            result = objects[ref]
+        except IndexError:
+            raise DataIntegrityError("Reference to object {0} of {1}".format(ref, len(objects)))
+        if result is _MISSING:
+            stats = self.stats
+            stats.objects_decoded += 1
+            if stats.objects_decoded > self._max_objects:
+                raise DataIntegrityError("Object budget of {0} exceeded at object {1}".format(self._max_objects, ref))
+            pos = self._offset_table.item(ref)
+            type_byte = _UINT8.unpack_from(self._data, pos)[0]
+            try:
+                result = objects[ref] = self._dispatch[type_byte](self, type_byte, pos + 1)
+            except (struct.error, ValueError) as e:
+                # Lengths, refs or values running past the end of the payload, or undecodable text
+                raise DataIntegrityError("Cannot decode object {0} at offset {1}: {2}".format(ref, pos, e))
+        else:
+            self.stats.decodes_avoided += 1
+        return result
+
+    def _push_container(self, container, refs, is_dict):
+        if len(self._stack) >= self._max_depth:
+            raise DataIntegrityError("Maximum nesting depth of {0} exceeded".format(self._max_depth))
+        self._stack.append([container, refs, 0, is_dict, None])
+
+    def _fill_containers(self):
+        stack = self._stack
+        decode_ref = self._decode_ref
+        while stack:
+            frame = stack[-1]
+            container, refs, index, is_dict, key = frame
+            if index == len(refs):
+                stack.pop()
+                continue
+            frame[2] = index + 1
+
+            # May push a frame for a child container, which is then filled first
+            value = decode_ref(refs[index])
+            if not is_dict:
+                container.append(value)
+            elif index & 1:
+                container[key] = value
+            else:
+                frame[4] = value
+
+    def _read_length(self, type_byte, pos, width=1):
+        """
+        Returns the length encoded in the low nibble (or following int) and the position
+        after it, checking that the `width` bytes per item that follow are in the payload
+        """
+        if type_byte & 0x0F != 0x0F:
+            length = type_byte & 0x0F
+        else:
+            int_type_byte = _UINT8.unpack_from(self._data, pos)[0]
+            if int_type_byte & 0xF0 != 0x10:
+                raise DataIntegrityError("Definition not followed by int type at offset {0}".format(pos))
+            int_length = 1 << (int_type_byte & 0x0F)
+            length = _unpack_uint(self._data, pos + 1, int_length)
+            pos += 1 + int_length
+        if pos + length * width > self._end:
+            raise DataIntegrityError("Object at offset {0} runs past the end of the payload".format(pos))
+        return length, pos
+
+    def _read_refs(self, pos, count):
+        return decode_uint_array(self._data, pos, self._ref_size, count)
+
+    def _read_null(self, type_byte, pos):
+        return None
+
+    def _read_false(self, type_byte, pos):
+        return False
+
+    def _read_true(self, type_byte, pos):
+        return True
+
+    def _read_fill(self, type_byte, pos):
+        raise DataIntegrityError("Fill type not currently supported at offset {0}".format(pos))
+
+    def _read_unknown(self, type_byte, pos):
+        return None
+
+    def _read_int(self, type_byte, pos):
+        int_length = 1 << (type_byte & 0x0F)
+        try:
+            return _INT_STRUCTS[int_length].unpack_from(self._data, pos)[0]
+        except KeyError:
+            raise DataIntegrityError("Cannot decode multibyte int of length {0}".format(int_length))
+
+    def _read_float(self, type_byte, pos):
+        float_length = 1 << (type_byte & 0x0F)
+        try:
+            return _FLOAT_STRUCTS[float_length].unpack_from(self._data, pos)[0]
+        except KeyError:
+            raise DataIntegrityError("Cannot decode float of length {0}".format(float_length))
+
+    def _read_date(self, type_byte, pos):
+        date_value = _FLOAT_STRUCTS[8].unpack_from(self._data, pos)[0]
+        try:
+            return _DATE_EPOCH + datetime.timedelta(seconds=date_value)
+        except OverflowError:
+            return datetime.datetime.min
+
+    def _read_data(self, type_byte, pos):
+        data_length, pos = self._read_length(type_byte, pos)
+        if self._copy_data:
+            return bytes(self._data[pos:pos + data_length])
+        return self._view[pos:pos + data_length]
+
+    def _read_ascii(self, type_byte, pos):
+        ascii_length, pos = self._read_length(type_byte, pos)
+        return self._intern_text(_decode_text(self._data[pos:pos + ascii_length], "ascii"))
+
+    def _read_utf16(self, type_byte, pos):
+        utf16_length, pos = self._read_length(type_byte, pos, 2)
+        return self._intern_text(_decode_text(self._data[pos:pos + utf16_length * 2], "utf_16_be"))
+
+    def _intern_text(self, text):
+        interned = self._strings.get(text)
+        if interned is None:
+            interned = self._strings[text] = _intern(text)
+        else:
+            self.stats.strings_shared += 1
+        return interned
+
+    def _read_uid(self, type_byte, pos):
+        return UID(_unpack_uint(self._data, pos, (type_byte & 0x0F) + 1))
+
+    def _read_array(self, type_byte, pos):
+        array_count, pos = self._read_length(type_byte, pos, self._ref_size)
+        array_result = []
+        if array_count:
+            self._push_container(array_result, self._read_refs(pos, array_count).tolist(), False)
+        return array_result
+
+    def _read_dict(self, type_byte, pos):
+        dict_count, pos = self._read_length(type_byte, pos, 2 * self._ref_size)
+        dict_result = {}
+        if dict_count:
+            # Interleave as key0, value0, key1, value1, ...
+            refs = self._read_refs(pos, dict_count * 2).reshape(2, dict_count).T.ravel()
+            self._push_container(dict_result, refs.tolist(), True)
+        return dict_result
+
+    def _read_lazy_array(self, type_byte, pos):
+        array_count, pos = self._read_length(type_byte, pos, self._ref_size)
+        return LazyArray(self, self._read_refs(pos, array_count))
+
+    def _read_lazy_dict(self, type_byte, pos):
+        dict_count, pos = self._read_length(type_byte, pos, 2 * self._ref_size)
+        refs = self._read_refs(pos, dict_count * 2)
+        return LazyDict(self, refs[:dict_count], refs[dict_count:])
+
+
+def _build_dispatch_table(lazy):
+    # Plain functions rather than unbound methods, so dispatch skips the py2 instance check
+    readers = vars(_BufferDecoder)
+    array_reader = readers["_read_lazy_array" if lazy else "_read_array"]
+    dict_reader = readers["_read_lazy_dict" if lazy else "_read_dict"]
+    table = [readers["_read_unknown"]] * 256
+    table[0x00] = readers["_read_null"]
+    table[0x08] = readers["_read_false"]
+    table[0x09] = readers["_read_true"]
+    table[0x0F] = readers["_read_fill"]
+    table[0x33] = readers["_read_date"]
+    for low in range(16):
+        table[0x10 | low] = readers["_read_int"]
+        table[0x20 | low] = readers["_read_float"]
+        table[0x40 | low] = readers["_read_data"]
+        table[0x50 | low] = readers["_read_ascii"]
+        table[0x60 | low] = readers["_read_utf16"]
+        table[0x80 | low] = readers["_read_uid"]
+        table[0xA0 | low] = array_reader
+        table[0xC0 | low] = array_reader  # Sets decode to lists, as in read_set
+        table[0xD0 | low] = dict_reader
+    return tuple(table)
+
+
+_BUFFER_DISPATCH = _build_dispatch_table(lazy=False)
+_LAZY_DISPATCH = _build_dispatch_table(lazy=True)
+
+
+##############################################################
+#                  ENCODING FUNCTIONS                        #
+##############################################################
+if _PY2:
+    # As when reading: text is unicode, str is binary data
+    _TEXT_TYPES = (unicode,)
+    _DATA_TYPES = (str, bytearray, memoryview, buffer)
+else:
+    _TEXT_TYPES = (str,)
+    _DATA_TYPES = (bytes, bytearray, memoryview)
+
+
+def _uint_size(value):
+    for size in (1, 2, 4):
+        if value < 1 << (8 * size):
+            return size
+    return 8
+
+
+def _encode_uint(value):
+    """ An unsigned int object, as used for lengths """
+    size = _uint_size(value)
+    return struct.pack(">B", 0x10 | (size.bit_length() - 1)) + _UINT_STRUCTS[size].pack(value)
+
+
+def _encode_marker(kind, count):
+    if count < 0x0F:
+        return struct.pack(">B", kind | count)
+    return struct.pack(">B", kind | 0x0F) + _encode_uint(count)
+
+
+def _encode_scalar(obj):
+    if obj is None:
+        return b"\x00"
+    if obj is False:
+        return b"\x08"
+    if obj is True:
+        return b"\x09"
+    if isinstance(obj, UID):
+        size = _uint_size(obj.value)
+        return struct.pack(">B", 0x80 | (size - 1)) + _UINT_STRUCTS[size].pack(obj.value)
+    if isinstance(obj, float):
+        return b"\x23" + _FLOAT_STRUCTS[8].pack(obj)
+    if isinstance(obj, datetime.datetime):
+        return b"\x33" + _FLOAT_STRUCTS[8].pack((obj - _DATE_EPOCH).total_seconds())
+    if isinstance(obj, _TEXT_TYPES):
+        try:
+            return _encode_marker(0x50, len(obj)) + obj.encode("ascii")
+        except UnicodeEncodeError:
+            encoded = obj.encode("utf_16_be")
+            return _encode_marker(0x60, len(encoded) // 2) + encoded
+    if isinstance(obj, _DATA_TYPES):
+        data = obj.tobytes() if isinstance(obj, memoryview) else bytes(obj)
+        return _encode_marker(0x40, len(data)) + data
+    if isinstance(obj, (int, long) if _PY2 else int):
+        # Widths the decoders read back with the same sign: 1 byte unsigned, 4 and 8 bytes signed
+        if 0 <= obj < 1 << 8:
+            return b"\x10" + _UINT_STRUCTS[1].pack(obj)
+        if -(1 << 31) <= obj < 1 << 31:
+            return b"\x12" + _INT_STRUCTS[4].pack(obj)
+        return b"\x13" + _INT_STRUCTS[8].pack(obj)
+    raise TypeError("Cannot encode object of type {0}".format(type(obj)))
+
+
+class _Encoder(object):
+    """
+    Flattens a data structure into a binary property list. Equal strings are
+    written once and shared; containers are written once per occurrence.
+    """
+
+    def __init__(self):
+        self._entries = []
+        self._strings = {}
+
+    def flatten(self, obj):
+        """ Adds obj (and everything it contains) to the object table, returning its index """
+        if isinstance(obj, _TEXT_TYPES):
+            key = (type(obj), obj)
+            if key in self._strings:
+                return self._strings[key]
+
+        index = len(self._entries)
+        self._entries.append(None)
+        if isinstance(obj, dict):
+            keys = list(obj.keys())
+            refs = [self.flatten(key) for key in keys] + [self.flatten(obj[key]) for key in keys]
+            self._entries[index] = (0xD0, len(keys), refs)
+        elif isinstance(obj, (list, tuple)):
+            self._entries[index] = (0xA0, len(obj), [self.flatten(item) for item in obj])
+        elif isinstance(obj, (set, frozenset)):
+            self._entries[index] = (0xC0, len(obj), [self.flatten(item) for item in obj])
+        else:
+            self._entries[index] = _encode_scalar(obj)
+            if isinstance(obj, _TEXT_TYPES):
+                self._strings[(type(obj), obj)] = index
+        return index
+
+    def encode(self, top_object):
+        ref_size = _uint_size(len(self._entries))
+        ref_code = ">" + {1: "B", 2: "H", 4: "I"}[ref_size]
+
+        chunks = [b"bplist00"]
+        offsets = []
+        position = len(chunks[0])
+        for entry in self._entries:
+            if isinstance(entry, tuple):
+                kind, count, refs = entry
+                entry = _encode_marker(kind, count) + struct.pack(ref_code[0] + ref_code[1] * len(refs), *refs)
+            offsets.append(position)
+            chunks.append(entry)
+            position += len(entry)
+
+        offset_table_offset = position
+        offset_size = _uint_size(offset_table_offset)
+        chunks.append(struct.pack(">" + {1: "B", 2: "H", 4: "I", 8: "Q"}[offset_size] * len(offsets), *offsets))
+        chunks.append(_TRAILER.pack(offset_size, ref_size, len(self._entries), top_object, offset_table_offset))
+        return b"".join(chunks)
+
+
 ##############################################################
 #                      ENTRY POINT                           #
 ##############################################################
-def read(f):
+def read_buffer(data, stats=None, lazy=False, max_depth=None, max_objects=None, copy_data=False):
+    """
+    Reads a binary property list held entirely in memory.
+    :param data: The whole property list as a bytes-like object (bytes, bytearray, memoryview)
+    :param stats: Optional DecodeStats to fill in
+    :param lazy: Return arrays, sets and dicts as LazyArray/LazyDict proxies that
+                 decode their children on first access
+    :param max_depth: Maximum nesting depth of containers, unlimited by default
+    :param max_objects: Maximum number of objects to decode, unlimited by default
+    :param copy_data: Return Data objects as bytes copies. By default they are memoryview
+                      slices sharing the payload's memory, which keep the payload alive
+    :return: A data structure representing the data in the property list
     """
-    Reads a file-like object containing a binary property list.
+    return _BufferDecoder(data, stats, lazy, max_depth, max_objects, copy_data).decode()
+
+
+def read(f, stats=None, max_depth=None, max_objects=None):
+    """
+    Reads a file-like object containing a binary property list. The whole file is
+    read into memory and decoded as by read_buffer(), without recursion, so deeply
+    nested containers are bounded by `max_depth` rather than the interpreter stack.
     :param f: Any file-like object that supports reading and seeking
+    :param stats: Optional DecodeStats to fill in
+    :param max_depth: Maximum nesting depth of containers, unlimited by default
+    :param max_objects: Maximum number of objects to decode, unlimited by default
     :return: A data structure representing the data in the property list
     """
-    # Verify header
     f.seek(0)
-    header = f.read(8)
-    if header != b"bplist00":
-        raise DataIntegrityError("Bad file header")
-
-    # Read footer
-    f.seek(-32, os.SEEK_END)
-    footer = f.read(32)
-    offset_int_size, collection_offset_size, \
-        object_count, top_level_object_index, offest_table_offset = struct.unpack(">6xbbQQQ", footer)
-
-    # Read offset table
-    f.seek(offest_table_offset)
-    offset_table = []
-    for i in range(object_count):
-        offset_table.append(__decode_multibyte_int(f.read(offset_int_size), False))
-
-    return __decode_object(f, offset_table[top_level_object_index], collection_offset_size, offset_table)
+    return read_buffer(f.read(), stats=stats, max_depth=max_depth, max_objects=max_objects, copy_data=True)
+
+
+def write(obj, f):
+    """
+    Writes a data structure to a file-like object as a binary property list.
+    Supports the types read() returns: None, bool, int, float, datetime, text,
+    bytes-like data, UID, list/tuple, set and dict.
+    :param obj: The top-level object to write
+    :param f: Any file-like object that supports writing bytes
+    """
+    encoder = _Encoder()
+    top_object = encoder.flatten(obj)
+    f.write(encoder.encode(top_object))
@@ -0,0 +1,198 @@
+"""
+Persistent on-disk cache of parsed Sketch documents.
+
+Each parsed MSDocumentData is pickled into its own file, named after the SHA-1
+of the document's payload and of the filters it was read with. A small SQLite index maps each path (with the mtime
+and size it had when it was read) to that digest and tracks when every entry
+was last used, so that the cache can be kept under a size bound by evicting the
+least recently used documents.
+
+A warm read of an unchanged file is an index lookup and a single file read. A
+file that was touched but not changed is re-hashed, but not re-parsed.
+"""
+import hashlib
+import os
+import sqlite3
+import tempfile
+import time
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+import sketch
+
+
+# Bumped whenever the pickled form of the models changes, which drops every entry
+_FORMAT_VERSION = 9
+
+_INDEX_NAME = "index.sqlite"
+
+
+class DocumentCache(object):
+    """
+    Caches parsed Sketch documents in a directory.
+
+        cache = DocumentCache("/var/cache/sketch", max_bytes=512 << 20)
+        document = cache.read("design.sketch")   # or sketch.read(filename, cache=cache)
+
+    :param directory: Where cached documents and their index are kept; created if needed
+    :param max_bytes: Upper bound on the total size of the cached documents
+    """
+
+    def __init__(self, directory, max_bytes=256 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self._conn = sqlite3.connect(os.path.join(directory, _INDEX_NAME))
+        self._setup()
+
+    def _setup(self):
+        version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+        if version != _FORMAT_VERSION:
+            self._conn.execute("DROP TABLE IF EXISTS paths")
+            self._conn.execute("DROP TABLE IF EXISTS documents")
+            self._remove_document_files()
+        self._conn.execute("CREATE TABLE IF NOT EXISTS documents "
+                           "(key text PRIMARY KEY, size integer, last_access real)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS paths "
+                           "(path text PRIMARY KEY, mtime real, size integer, digest text)")
+        self._conn.execute("PRAGMA user_version = {0}".format(_FORMAT_VERSION))
+        self._conn.commit()
+
+    def _document_path(self, key):
+        return os.path.join(self.directory, key + ".pickle")
+
+    def _remove_document_files(self):
+        for name in os.listdir(self.directory):
+            if name.endswith(".pickle"):
+                os.remove(os.path.join(self.directory, name))
+
+    def read(self, filename, lazy=False, mode="lazy", pages=None, layer_classes=None, max_depth=None,
+             max_nesting=None, max_objects=None):
+        """
+        Returns the parsed MSDocumentData for filename, from the cache when possible.
+
+        Documents read with different filters (pages, layer_classes, max_depth, see
+        converter.deserialize()) are cached apart. lazy and mode only set how a
+        document is parsed on a miss: it is stored apart from the archive and the
+        payload it came from, so it is read with copy_data=True and whatever a lazy
+        read left unconverted is converted when it is stored. So do the decoder
+        budgets, max_nesting and max_objects (see sketch.read()): a document in the
+        cache has been decoded already.
+        """
+        filters = dict(pages=pages, layer_classes=layer_classes, max_depth=max_depth)
+        path = os.path.abspath(filename)
+        stat = os.stat(path)
+
+        row = self._conn.execute("SELECT mtime, size, digest FROM paths WHERE path=?", (path,)).fetchone()
+        if row is not None and row[0] == stat.st_mtime and row[1] == stat.st_size:
+            document = self._load(_document_key(row[2], filters))
+            if document is not None:
+                return document
+
+        payload = sketch._fetch_plist(path)
+        digest = hashlib.sha1(payload).hexdigest()
+        key = _document_key(digest, filters)
+
+        document = self._load(key)
+        if document is None:
+            document = sketch._parse_plist(payload, lazy=lazy, copy_data=True, mode=mode,
+                                           max_nesting=max_nesting, max_objects=max_objects, **filters)
+            self._store(key, document)
+
+        self._conn.execute("INSERT OR REPLACE INTO paths VALUES (?, ?, ?, ?)",
+                           (path, stat.st_mtime, stat.st_size, digest))
+        self._conn.commit()
+        return document
+
+    def _load(self, key):
+        """ Returns the cached document with the given key, or None if there is no usable entry """
+        if self._conn.execute("SELECT 1 FROM documents WHERE key=?", (key,)).fetchone() is None:
+            return None
+
+        try:
+            with open(self._document_path(key), "rb") as f:
+                document = pickle.load(f)
+        except Exception:
+            # Missing or unreadable, e.g. removed by hand or written by an incompatible version
+            self._forget(key)
+            return None
+
+        self._conn.execute("UPDATE documents SET last_access=? WHERE key=?", (time.time(), key))
+        self._conn.commit()
+        return document
+
+    def _store(self, key, document):
+        # Written to a temporary file first so readers never see a partial document
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(document, f, pickle.HIGHEST_PROTOCOL)
+            size = os.path.getsize(temp_path)
+            os.rename(temp_path, self._document_path(key))
+        except Exception:
+            os.remove(temp_path)
+            raise
+
+        self._conn.execute("INSERT OR REPLACE INTO documents VALUES (?, ?, ?)", (key, size, time.time()))
+        self._evict(keep=key)
+        self._conn.commit()
+
+    def _evict(self, keep=None):
+        """ Removes least recently used documents until the cache fits in max_bytes """
+        total = self.size
+        if total <= self.max_bytes:
+            return
+
+        rows = self._conn.execute("SELECT key, size FROM documents ORDER BY last_access").fetchall()
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            self._forget(key)
+            total -= size
+
+    def _forget(self, key):
+        # The path rows stay: they map files to payload digests, which are still right
+        self._conn.execute("DELETE FROM documents WHERE key=?", (key,))
+        self._conn.commit()
+        try:
+            os.remove(self._document_path(key))
+        except OSError:
+            pass
+
+    @property
+    def size(self):
+        """ Total size in bytes of the cached documents """
+        return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM documents").fetchone()[0]
+
+    def clear(self):
+        """ Removes every cached document """
+        self._conn.execute("DELETE FROM paths")
+        self._conn.execute("DELETE FROM documents")
+        self._conn.commit()
+        self._remove_document_files()
+
+    def close(self):
+        self._conn.close()
+
+
+def _document_key(digest, filters):
+    """
+    The name of the cached document parsed from the payload with the given SHA-1
+    digest and filters: the digest alone for whole documents
+    """
+    options = []
+    for name, value in sorted(filters.items()):
+        if value is None:
+            continue
+        if not isinstance(value, (int, basestring)):
+            value = sorted(value)
+        options.append((name, value))
+    if not options:
+        return digest
+    return digest + "-" + hashlib.sha1(repr(options)).hexdigest()
@@ -2,12 +2,21 @@
 Translates plain ol' Binary Plist data into sketch.model objects
 """
 import datetime
-
-from sketch.bplist import UID
-from sketch.models.MSCurvePoint import MSCurvePoint
+from timeit import default_timer
+
+from sketch.bplist import (
+    LazyArray,
+    LazyDict,
+    UID
+)
+from sketch.models.MSCurvePoint import (
+    MSCurvePoint,
+    parsePoints
+)
 from sketch.models.MSDocumentData import MSDocumentData
+from sketch.models.LayerInfo import LayerInfo
 from sketch.models.MSImageCollection import MSImageCollection
-from sketch.models.MSLayer import MSLayer
+from sketch.models.MSLayer import MSLayer, layer_classnames
 from sketch.models.MSLayerGroup import MSLayerGroup
 from sketch.models.MSPage import MSPage
 from sketch.models.MSRect import MSRect
@@ -19,10 +28,108 @@ from sketch.models.MSTextLayer import MSTextLayer
 ##############################################################
 #                  MSARCHIVER CONVERTER FUNCTIONS            #
 ##############################################################
+# Marks objects not converted yet, as None is a valid conversion
+_MISSING = object()
+
+# Converters by $classname, as (converter, predicate) pairs. See register_converter()
+_CONVERTERS = {}
+
+# Classnames whose converters read the archived objects below them themselves
+_LEAF_CLASSES = set()
+
+# Model classes of the layers converters return, by $classname. See register_converter()
+_LAYER_MODELS = {}
+
+
+def register_converter(classnames, predicate=None, leaf=False, model=None):
+    """
+    Decorator registering a converter for archived objects of the given $classname(s).
+    The converter is called with the archived object (an MSArchiverDictionary) and
+    returns what it should be replaced with. If a predicate is given, objects it
+    returns False for are left unconverted. Registering a classname again replaces
+    its converter, so built in converters can be overridden too.
+
+        @register_converter("MSSliceLayer")
+        def convert_MSSliceLayer(obj):
+            return MySliceLayer(name=obj["name"], frame=obj["frame"])
+
+    :param classnames: A classname or a sequence of classnames
+    :param predicate: Optional structural check, called with the archived object
+    :param leaf: Set if the converter reads the archived objects it refers to
+                 itself (e.g. through MSArchiverDictionary.raw()), so that eager
+                 conversion need not convert them first
+    :param model: The MSLayer subclass the converter returns, for pages and layers.
+                  Lets walk() and deserialize()'s layer_classes filter match archived
+                  layers by their model classes without converting them
+    """
+    if isinstance(classnames, basestring):
+        classnames = (classnames,)
+
+    def decorator(converter):
+        for classname in classnames:
+            _CONVERTERS[classname] = (converter, predicate)
+            if model is not None:
+                _LAYER_MODELS[classname] = model
+            else:
+                _LAYER_MODELS.pop(classname, None)
+            if leaf:
+                _LEAF_CLASSES.add(classname)
+            else:
+                _LEAF_CLASSES.discard(classname)
+        return converter
+
+    return decorator
+
+
+def archived_classnames(classname):
+    """
+    The classnames an archived layer of the given $classname goes by, as it will
+    once converted (see layer_classnames()): its $classname and, through the model
+    class registered for it, the names of that class and its bases
+    """
+    model = _LAYER_MODELS.get(classname)
+    if model is None:
+        return frozenset((classname,))
+    return layer_classnames(model, classname)
+
+
+def get_classname(obj):
+    """
+    The $classname of an archived object, or None if it is not an archived object.
+    The class is looked up in the object table without converting it.
+    """
+    if not isinstance(obj, dict) or "$class" not in obj:
+        return None
+    if isinstance(obj, MSArchiverDictionary):
+        cls = obj.raw("$class")
+        if isinstance(cls, UID):
+            cls = obj.object_table[cls.value]
+    else:
+        cls = obj["$class"]
+    return cls.get("$classname") if isinstance(cls, (dict, LazyDict)) else None
+
+
+def _is_archived(obj, classnames):
+    """
+    Whether obj is an archived object of one of the given classnames that passes
+    the structural check registered for its class (see register_converter()).
+    Backs the public is_* checks.
+    """
+    if not isinstance(obj, dict):
+        return False
+    classname = get_classname(obj)
+    if classname not in classnames:
+        return False
+    predicate = _CONVERTERS.get(classname, (None, None))[1]
+    return predicate is None or bool(predicate(obj))
+
+
 def MSArchiver_object_converter(o):
     """
     Built in converter function (suitable for submission to set_object_converter())
-    which automatically converts the following common data-types found in MSArchiver:
+    which converts archived objects with the converter registered for their $classname
+    (see register_converter()). Converters are built in for the sketch.models classes and
+    the following common data-types found in MSArchiver:
         * NSDictionary/NSMutableDictionary;
         * NSArray/NSMutableArray;
         * NSSet/NSMutableSet
@@ -30,111 +137,338 @@ def MSArchiver_object_converter(o):
         * NSDate
         * $null strings
     """
-    if is_MSDocumentData(o):
-        return convert_MSDocumentData(o)
-
-    if is_MSPage(o):
-        return convert_MSPage(o)
+    if isinstance(o, dict):
+        classname = get_classname(o)
+        entry = _CONVERTERS.get(classname)
+        if entry is not None:
+            converter, predicate = entry
+            if predicate is None or predicate(o):
+                context = getattr(o, "context", None)
+                if context is not None and context.stats.per_class:
+                    result = _timed_conversion(converter, o, classname, context.stats)
+                else:
+                    result = converter(o)
+                if isinstance(result, MSLayer):
+                    result._classname = classname
+                return result
+        return o
 
-    if is_MSLayerGroup(o):
-        return convert_MSLayerGroup(o)
+    # Conversion: "$null" string
+    if isinstance(o, str) and o == "$null":
+        return None
 
-    if is_MSLayer(o):
-        return convert_MSLayer(o)
+    # Fallback:
+    return o
 
-    if is_MSShapePathLayer(o):
-        return convert_MSShapePathLayer(o)
 
-    if is_MSTextLayer(o):
-        return convert_MSTextLayer(o)
+class ConversionStats(object):
+    """
+    Counters describing a single deserialization. Pass an instance as `stats`
+    to deserialize() to have it filled in; conversions done lazily after
+    deserialize() returns keep counting into it.
 
-    if is_MSShapePath(o):
-        return convert_MSShapePath(o)
+    With per_class=True, converter invocations are also counted and timed by
+    $classname. Times exclude the time spent converting other objects from
+    within a converter, e.g. an MSShapePathLayer's time does not include its path's.
+    """
+    def __init__(self, per_class=False):
+        # Archived objects converted
+        self.conversions = 0
+        # References to already converted objects, served from the cache
+        self.cache_hits = 0
 
-    if is_MSCurvePoint(o):
-        return convert_MSCurvePoint(o)
+        self.per_class = per_class
+        # Converter invocations and seconds spent in them, by $classname
+        self.class_counts = {}
+        self.class_seconds = {}
+        # Time spent in nested conversions, per converter currently running
+        self._nested_seconds = []
 
-    if is_MSRect(o):
-        return convert_MSRect(o)
+    def __repr__(self):
+        return "<ConversionStats conversions: {0} cache_hits: {1}>".format(self.conversions, self.cache_hits)
 
-    if is_MSImageCollection(o):
-        return convert_MSImageCollection(o)
 
-    if is_MSArray(o):
-        return convert_MSArray(o)
+class ConversionContext(object):
+    """
+    State shared by everything converted from one archive: its object table and
+    the converted objects, keyed by their index in it, so that the same UID always
+    converts to the same Python object. The cache goes away with the context,
+    i.e. once nothing converted from the archive is left that could still convert
+    more of it.
+
+    In eager mode collections convert to plain lists and dicts of converted
+    values instead of MSArchiverList/MSArchiverDictionary wrappers, so nothing
+    converted keeps a reference to the context or the object table.
+    """
+    def __init__(self, object_table, stats=None, eager=False, excluded=None):
+        self.object_table = object_table
+        self.converted = {}
+        self.stats = stats if stats is not None else ConversionStats()
+        self.eager = eager
+        # Indexes of objects left out of every list they appear in (see deserialize's filters)
+        self.excluded = excluded or frozenset()
+        # Objects being converted in eager mode; reaching one again means a cycle
+        self.converting = set()
+        # Objects _convert_eagerly() is still converting the dependencies of, and the
+        # (container, key) slots of plain lists and dicts waiting for each of them
+        self.visiting = set()
+        self.fixups = {}
+
+
+def MSArchiver_convert(o, context):
+    if not isinstance(context, ConversionContext):
+        context = ConversionContext(context)
+
+    if isinstance(o, UID):
+        return _convert_object(o.value, context)
+
+    # Exact type checks: isinstance() against the lazy containers' ABCs is slow to fail
+    kind = type(o)
+    if kind is list or kind is LazyArray:
+        if context.excluded:
+            o = _without_excluded(o, context)
+        if context.eager:
+            result = [None] * len(o)
+            for position, item in enumerate(o):
+                result[position] = _convert_member(item, context, result, position)
+            return result
+        result = MSArchiverList(o, context)
+    elif kind is dict or kind is LazyDict:
+        result = MSArchiverDictionary(o, context)
+        if context.eager:
+            converted = MSArchiver_object_converter(result)
+            if converted is result:
+                # No converter: a plain dict of the converted values takes the wrapper's place
+                converted = {}
+                for key in result.keys():
+                    converted[key] = _convert_member(result.raw(key), context, converted, key)
+            return converted
+    else:
+        result = o
 
-    if is_NSArray(o):
-        return convert_NSArray(o)
+    return MSArchiver_object_converter(result)
 
-    if is_NSSet(o):
-        return convert_NSSet(o)
 
-    if is_NSMutableDictionary(o):
-        return convert_NSMutableDictionary(o)
+def _convert_object(index, context):
+    """ Converts the object at `index` in the object table, once per context """
+    result = context.converted.get(index, _MISSING)
+    if result is not _MISSING:
+        context.stats.cache_hits += 1
+        return result
+
+    if context.eager:
+        if index in context.converting:
+            raise ValueError("Object {0} refers back to itself and cannot be converted eagerly".format(index))
+        context.converting.add(index)
+        result = MSArchiver_convert(context.object_table[index], context)
+        context.converting.discard(index)
+        for container, key in context.fixups.pop(index, ()):
+            container[key] = result
+    else:
+        result = MSArchiver_convert(context.object_table[index], context)
 
-    elif is_NSString(o):
-        return convert_NSString(o)
+    context.converted[index] = result
+    context.stats.conversions += 1
+    return result
 
-    if is_NSDate(o):
-        return convert_NSDate(o)
 
-    # Conversion: "$null" string
-    if isinstance(o, str) and o == "$null":
+def _convert_member(o, context, container, key):
+    """
+    Converts an item of a plain list or dict built in eager mode. A reference back
+    to an object whose conversion is waiting on this one (e.g. an NSTextStorage's
+    NSDelegate, its text layer) is left as None and filled in once that object is
+    converted, rather than converting it early, which would recurse or find a cycle
+    """
+    if isinstance(o, UID) and o.value in context.visiting and o.value not in context.converted:
+        context.fixups.setdefault(o.value, []).append((container, key))
         return None
-
-    # Fallback:
-    return o
-
-
-def MSArchiver_convert(o, object_table):
-    if isinstance(o, list):
-        result = MSArchiverList(o, object_table)
-    elif isinstance(o, dict):
-        result = MSArchiverDictionary(o, object_table)
-    elif isinstance(o, UID):
-        result = MSArchiver_convert(object_table[o.value], object_table)
-    else:
-        result = o
-
-    return MSArchiver_object_converter(result)
+    return MSArchiver_convert(o, context)
+
+
+def _timed_conversion(converter, obj, classname, stats):
+    """ Runs converter(obj), adding its invocation and own time to the per-class stats """
+    stats._nested_seconds.append(0.0)
+    start = default_timer()
+    try:
+        return converter(obj)
+    finally:
+        elapsed = default_timer() - start
+        nested = stats._nested_seconds.pop()
+        if stats._nested_seconds:
+            stats._nested_seconds[-1] += elapsed
+        stats.class_counts[classname] = stats.class_counts.get(classname, 0) + 1
+        stats.class_seconds[classname] = stats.class_seconds.get(classname, 0.0) + elapsed - nested
+
+
+def _without_excluded(items, context):
+    """ The archived items of a list, less references to excluded objects """
+    excluded = context.excluded
+    return [item for item in items if not (isinstance(item, UID) and item.value in excluded)]
+
+
+def _references(o):
+    """ Indexes of the objects `o` refers to, including through inline collections """
+    indexes = []
+    pending = [o]
+    while pending:
+        o = pending.pop()
+        kind = type(o)
+        if kind is list or kind is LazyArray:
+            pending.extend(o)
+        elif kind is dict or kind is LazyDict:
+            pending.extend(o.values())
+        elif isinstance(o, UID):
+            indexes.append(o.value)
+    return indexes
+
+
+def _convert_eagerly(top, context):
+    """
+    Converts everything reachable from `top` in dependency order: a depth first
+    walk over the UID graph, kept on an explicit stack, converts each object
+    once all the objects it refers to are converted. Converters then only ever
+    find converted objects, so conversion never recurses through the archive.
+
+    References back up the walk (an object referring to one of the objects whose
+    dependencies are being converted, e.g. an NSTextStorage's NSDelegate, its text
+    layer) cannot be converted first. Converters do not read them; where they end
+    up in plain lists and dicts they are filled in once their object is converted
+    (see _convert_member()).
+    """
+    table = context.object_table
+    converted = context.converted
+    excluded = context.excluded
+    visiting = context.visiting
+
+    # Frames of [object index (None for top), iterator over the indexes it refers to]
+    stack = [(None, iter(_references(top)))]
+    while stack:
+        index, references = stack[-1]
+        for reference in references:
+            if reference not in converted and reference not in visiting and reference not in excluded:
+                visiting.add(reference)
+                o = table[reference]
+                if _raw_classname(o, table) in _LEAF_CLASSES:
+                    stack.append((reference, iter(())))
+                else:
+                    stack.append((reference, iter(_references(o))))
+                break
+        else:
+            stack.pop()
+            if index is not None:
+                visiting.discard(index)
+                _convert_object(index, context)
+
+    return MSArchiver_convert(top, context)
 
 
 class MSArchiverDictionary(dict):
-    def __init__(self, original_dict, object_table):
+    def __init__(self, original_dict, context):
         super(MSArchiverDictionary, self).__init__(original_dict)
-        self.object_table = object_table
+        self.context = context
+
+    @property
+    def object_table(self):
+        return self.context.object_table
 
     def __getitem__(self, index):
         o = super(MSArchiverDictionary, self).__getitem__(index)
-        return MSArchiver_convert(o, self.object_table)
+        return MSArchiver_convert(o, self.context)
 
     def get(self, key, default=None):
         return self[key] if key in self else default
 
+    def raw(self, key):
+        """ The archived value for `key`, without conversion """
+        return super(MSArchiverDictionary, self).__getitem__(key)
+
+    def __reduce__(self):
+        # Pickled converted, as a plain dict, rather than with the object table
+        return dict, (list((key, self[key]) for key in self.keys()),)
+
 
 class MSArchiverList(list):
-    def __init__(self, original_iterable, object_table):
+    def __init__(self, original_iterable, context):
         super(MSArchiverList, self).__init__(original_iterable)
-        self.object_table = object_table
+        self.context = context
+        # Called with each item as it is accessed, e.g. by a group to link its layers to it
+        self.on_convert = None
+
+    @property
+    def object_table(self):
+        return self.context.object_table
 
     def __getitem__(self, index):
         o = super(MSArchiverList, self).__getitem__(index)
-        return MSArchiver_convert(o, self.object_table)
+        item = MSArchiver_convert(o, self.context)
+        if self.on_convert is not None:
+            self.on_convert(item)
+        return item
 
     def __iter__(self):
         for o in super(MSArchiverList, self).__iter__():
-            yield MSArchiver_convert(o, self.object_table)
+            item = MSArchiver_convert(o, self.context)
+            if self.on_convert is not None:
+                self.on_convert(item)
+            yield item
+
+    def converted(self):
+        """ Yields the items that are converted already, without converting the others """
+        converted = self.context.converted
+        for o in super(MSArchiverList, self).__iter__():
+            if isinstance(o, UID):
+                o = converted.get(o.value, _MISSING)
+                if o is _MISSING:
+                    continue
+            yield o
+
+    def walk(self, prune=None, classes=None):
+        """ See walk_archived() """
+        return walk_archived(self, prune, classes)
+
+    def __reduce__(self):
+        # Pickled converted, as a plain list, rather than with the object table
+        return list, (list(self),)
 
 
-def deserialize(obj):
+def is_lazy(obj):
+    """
+    Archives read with bplist's lazy mode stay lazy through conversion: their
+    collections convert each element on access rather than all up front.
+    Eager conversion overrides this.
+    """
+    context = getattr(obj, "context", None)
+    return context is not None and not context.eager and isinstance(context.object_table, LazyArray)
+
+
+def deserialize(obj, stats=None, mode="lazy", pages=None, layer_classes=None, max_depth=None):
     """
     Deserializes a Sketch bplist rebuilding the structure.
     obj should be the object returned by the bplist.load()
-    function
+    function. Each archived object is converted once, however many
+    times it is referenced; pass a ConversionStats as `stats` to count
+    conversions and cache hits.
+
+    With mode="lazy" collections are converted as they are accessed. With
+    mode="eager" every object reachable from the root is converted up front,
+    in one pass, and the result holds no reference to the object table.
+
+    The filters leave pages and layers out of the document. Left out subtrees
+    are never converted, and with an archive read by bplist's lazy mode,
+    never decoded either.
+
+    :param pages: Indexes and/or names of the pages to keep
+    :param layer_classes: Classnames of the layers to keep, e.g. ("MSTextLayer",), matched
+                          as walk() matches them (see archived_classnames()).
+                          Groups are kept while any layer below them is.
+    :param max_depth: Depth of the deepest layers kept; a page's layers are at depth 1,
+                      so with 0 pages are kept without their layers
     """
+    if mode not in ("lazy", "eager"):
+        raise ValueError("mode must be 'lazy' or 'eager', not {0!r}".format(mode))
 
     # Check that this is an archiver and version we understand
-    if not isinstance(obj, dict):
+    if not isinstance(obj, (dict, LazyDict)):
         raise TypeError("obj must be a dict")
     if "$archiver" not in obj or obj["$archiver"] != "MSArchiver":
         raise ValueError("obj does not contain an '$archiver' key or the '$archiver' is unrecognised")
@@ -142,30 +476,206 @@ def deserialize(obj):
         raise ValueError("obj does not contain a '$version' key or the '$version' is unrecognised")
 
     object_table = obj["$objects"]
-    if "root" in obj["$top"]:
-        return MSArchiver_convert(obj["$top"]["root"], object_table)
-    else:
-        return MSArchiver_convert(obj["$top"], object_table)
+    top = obj["$top"]["root"] if "root" in obj["$top"] else obj["$top"]
+
+    excluded = None
+    if pages is not None or layer_classes is not None or max_depth is not None:
+        excluded = _excluded_objects(top, object_table, pages, layer_classes, max_depth)
+
+    context = ConversionContext(object_table, stats, eager=(mode == "eager"), excluded=excluded)
+    if context.eager:
+        return _convert_eagerly(top, context)
+    return MSArchiver_convert(top, context)
+
+
+##############################################################
+#                  SELECTIVE DESERIALIZATION                 #
+##############################################################
+def _raw_object(o, object_table):
+    """ The archived object a value refers to, without conversion """
+    return object_table[o.value] if isinstance(o, UID) else o
+
+
+def _raw_classname(o, object_table):
+    """ The $classname of an archived object, or None if it is not an archived object """
+    kind = type(o)
+    if (kind is dict or kind is LazyDict) and "$class" in o:
+        return _raw_object(o["$class"], object_table).get("$classname")
+    return None
+
+
+def _raw_list(o, object_table):
+    """ The archived items of an MSArray or NSArray, without conversion """
+    o = _raw_object(o, object_table)
+    classname = _raw_classname(o, object_table)
+    if classname == "MSArray":
+        return _raw_list(o["array_do"], object_table)
+    if classname not in ("NSArray", "NSMutableArray"):
+        return []
+    if "NS.objects" in o:
+        return list(o["NS.objects"])
+    return [o[key] for key in extract_individual_keys(o.keys())]
+
+
+def _raw_text(o, object_table):
+    """ The text of an archived string or NSString, without conversion """
+    o = _raw_object(o, object_table)
+    kind = type(o)
+    if kind is dict or kind is LazyDict:
+        return _raw_object(o.get("NS.string"), object_table)
+    return o
+
+
+def walk_archived(items, prune=None, classes=None):
+    """
+    Yields the pages or layers of a lazily converted list, and every layer below
+    them, in document order, without recursion. Each one is looked at as archived
+    first - $classname, objectID, name and flags, as a LayerInfo - and only
+    converted if it is yielded:
+
+    :param prune: Called with the LayerInfo of each page and layer; if it returns
+                  True, that page or layer and everything below it is skipped
+    :param classes: Classnames of the layers to yield, e.g. ("MSTextLayer",), matched
+                    against the archived $classname and the names of the model class
+                    and its bases (see archived_classnames()); others are walked through
+                    but not converted. All of them if None
+
+    Layers that are converted already are walked through their model, so that
+    layers added or removed since are walked as they are now.
+    """
+    if isinstance(classes, basestring):
+        classes = (classes,)
+    classes = frozenset(classes) if classes is not None else None
+    context = items.context
+    table = context.object_table
+
+    # Entries of (list, index in it, whether the list holds archived items rather than
+    # a model's layers, depth, the entry of the parent)
+    stack = [(items, index, False, 0, None) for index in reversed(range(len(items)))]
+    while stack:
+        entry = stack.pop()
+        container, index, archived, depth, parent = entry
+        item = list.__getitem__(container, index)
+        layer = context.converted.get(item.value, item) if isinstance(item, UID) else item
+
+        if isinstance(layer, MSLayer):
+            info = LayerInfo(layer._classname or type(layer).__name__, layer.objectID, layer.name,
+                             layer.isVisible, layer.isLocked, depth)
+        else:
+            o = _raw_object(item, table)
+            info = LayerInfo(_raw_classname(o, table), _raw_text(o.get("do_objectID"), table),
+                             _raw_text(o.get("name"), table), bool(_raw_object(o.get("isVisible", True), table)),
+                             bool(_raw_object(o.get("isLocked", False), table)), depth)
+
+        if prune is not None and prune(info):
+            continue
+        if classes is None or info.classname in classes:
+            wanted = True
+        elif isinstance(layer, MSLayer):
+            wanted = not classes.isdisjoint(layer._classnames())
+        else:
+            wanted = not classes.isdisjoint(archived_classnames(info.classname))
+        if wanted:
+            layer = _convert_walked(entry, context)
+            yield layer
+
+        if isinstance(layer, MSLayer):
+            children = getattr(layer, "layers", None) or []
+            children_archived = False
+        else:
+            children = _raw_list(o.get("layers"), table)
+            if context.excluded:
+                children = _without_excluded(children, context)
+            children_archived = True
+        stack.extend((children, child, children_archived, depth + 1, entry)
+                     for child in reversed(range(len(children))))
+
+
+def _convert_walked(entry, context):
+    """
+    Converts the layer of a walk_archived() stack entry through its group's layer
+    list, converting the groups above it that are still archived on the way down,
+    so that it is linked to its group as it would be if reached through the model
+    """
+    chain = []
+    while entry[2]:
+        chain.append(entry)
+        entry = entry[4]
+    layer = entry[0][entry[1]]
+    for container, index, archived, depth, parent in reversed(chain):
+        layers = getattr(layer, "layers", None) if isinstance(layer, MSLayer) else None
+        if layers is None:
+            # Not a group in the model: nothing to link the layer to
+            layer = MSArchiver_convert(list.__getitem__(container, index), context)
+        else:
+            layer = layers[index]
+    return layer
+
+
+def _excluded_objects(top, object_table, pages, layer_classes, max_depth):
+    """
+    Walks the archived page and layer tree, looking only at classnames, names
+    and layer lists, and returns the indexes of the pages and layers the
+    filters leave out. Nothing below a left out object is visited.
+    """
+    if isinstance(pages, (int, basestring)):
+        pages = (pages,)
+    if isinstance(layer_classes, basestring):
+        layer_classes = (layer_classes,)
+    layer_classes = frozenset(layer_classes) if layer_classes is not None else None
+    if max_depth is not None and max_depth < 0:
+        raise ValueError("max_depth must be 0 or more, not {0!r}".format(max_depth))
+
+    excluded = set()
+    document = _raw_object(top, object_table)
+    for page_index, page_ref in enumerate(_raw_list(document.get("pages"), object_table)):
+        page = _raw_object(page_ref, object_table)
+        if pages is not None and page_index not in pages and _raw_text(page.get("name"), object_table) not in pages:
+            excluded.add(page_ref.value)
+            continue
+
+        page_layers = _raw_list(page.get("layers"), object_table)
+        if max_depth == 0:
+            excluded.update(ref.value for ref in page_layers)
+            continue
+
+        # Layers in depth first order, as (index, parent index, classname)
+        layers = []
+        stack = [(ref, page_ref.value, 1) for ref in page_layers]
+        while stack:
+            ref, parent, depth = stack.pop()
+            layer = _raw_object(ref, object_table)
+            layers.append((ref.value, parent, _raw_object(layer["$class"], object_table).get("$classname")))
+
+            children = _raw_list(layer.get("layers"), object_table)
+            if max_depth is not None and depth >= max_depth:
+                excluded.update(child.value for child in children)
+            else:
+                stack.extend((child, ref.value, depth + 1) for child in children)
+
+        if layer_classes is None:
+            continue
+
+        # Children come after their parents, so in reverse every layer is seen before its group
+        kept_groups = set()
+        for index, parent, classname in reversed(layers):
+            if index in kept_groups or not layer_classes.isdisjoint(archived_classnames(classname)):
+                kept_groups.add(parent)
+            else:
+                excluded.add(index)
+
+    return excluded
 
 
 ##############################################################
 #                  MSDOCUMENTDATA FUNCTIONS                  #
 ##############################################################
 def is_MSDocumentData(obj):
-    if not isinstance(obj, dict):
-        return False
-    if "$class" not in obj.keys():
-        return False
-    if obj["$class"].get("$classname") not in ("MSDocumentData"):
-        return False
-
-    return True
+    return _is_archived(obj, ("MSDocumentData",))
 
 
+@register_converter("MSDocumentData")
 def convert_MSDocumentData(obj):
-    if not is_MSDocumentData(obj):
-        raise ValueError("obj does not have the correct structure for a MSDocumentData")
-
     return MSDocumentData(
         images=obj["images"],
         pages=obj["pages"],
@@ -186,20 +696,11 @@ def convert_MSDocumentData(obj):
 #                  MSPAGE FUNCTIONS               #
 ##############################################################
 def is_MSPage(obj):
-    if not isinstance(obj, dict):
-        return False
-    if "$class" not in obj.keys():
-        return False
-    if obj["$class"].get("$classname") not in ("MSPage"):
-        return False
-
-    return True
+    return _is_archived(obj, ("MSPage",))
 
 
+@register_converter("MSPage", model=MSPage)
 def convert_MSPage(obj):
-    if not is_MSPage(obj):
-        raise ValueError("obj does not have the correct structure for an MSPage")
-
     return MSPage(horizontalRulerData=obj["horizontalRulerData"],
                   verticalRulerData=obj["verticalRulerData"],
 
@@ -214,27 +715,19 @@ def convert_MSPage(obj):
                   isLocked=obj["isLocked"],
 
                   isFlippedHorizontal=obj["isFlippedHorizontal"],
-                  isFlippedVertical=obj["isFlippedVertical"])
+                  isFlippedVertical=obj["isFlippedVertical"],
+                  objectID=obj.get("do_objectID"))
 
 
 ##############################################################
 #                  MSLAYERGROUP FUNCTIONS                    #
 ##############################################################
 def is_MSLayerGroup(obj):
-    if not isinstance(obj, dict):
-        return False
-    if "$class" not in obj.keys():
-        return False
-    if obj["$class"].get("$classname") not in ("MSLayerGroup", "MSShapeGroup"):
-        return False
-
-    return True
+    return _is_archived(obj, ("MSLayerGroup", "MSShapeGroup"))
 
 
+@register_converter(("MSLayerGroup", "MSShapeGroup"), model=MSLayerGroup)
 def convert_MSLayerGroup(obj):
-    if not is_MSLayerGroup(obj):
-        raise ValueError("obj does not have the correct structure for an MSLayerGroup")
-
     return MSLayerGroup(layers=obj["layers"],
 
                         frame=obj["frame"],
@@ -246,27 +739,19 @@ def convert_MSLayerGroup(obj):
                         isLocked=obj["isLocked"],
 
                         isFlippedHorizontal=obj["isFlippedHorizontal"],
-                        isFlippedVertical=obj["isFlippedVertical"])
+                        isFlippedVertical=obj["isFlippedVertical"],
+                        objectID=obj.get("do_objectID"))
 
 
 ##############################################################
 #                  MSLAYER FUNCTIONS                         #
 ##############################################################
 def is_MSLayer(obj):
-    if not isinstance(obj, dict):
-        return False
-    if "$class" not in obj.keys():
-        return False
-    if obj["$class"].get("$classname") not in ("MSLayer"):
-        return False
-
-    return True
+    return _is_archived(obj, ("MSLayer",))
 
 
+@register_converter("MSLayer", model=MSLayer)
 def convert_MSLayer(obj):
-    if not is_MSLayer(obj):
-        raise ValueError("obj does not have the correct structure for an MSLayer")
-
     return MSLayer(frame=obj["frame"],
                    style=obj["style"],
                    name=obj["name"],
@@ -276,27 +761,19 @@ def convert_MSLayer(obj):
                    isLocked=obj["isLocked"],
 
                    isFlippedHorizontal=obj["isFlippedHorizontal"],
-                   isFlippedVertical=obj["isFlippedVertical"])
+                   isFlippedVertical=obj["isFlippedVertical"],
+                   objectID=obj.get("do_objectID"))
 
 
 ##############################################################
 #                  MSTEXTLAYER FUNCTIONS                     #
 ##############################################################
 def is_MSTextLayer(obj):
-    if not isinstance(obj, dict):
-        return False
-    if "$class" not in obj.keys():
-        return False
-    if obj["$class"].get("$classname") not in ("MSTextLayer"):
-        return False
-
-    return True
+    return _is_archived(obj, ("MSTextLayer",))
 
 
+@register_converter("MSTextLayer", model=MSTextLayer)
 def convert_MSTextLayer(obj):
-    if not is_MSTextLayer(obj):
-        raise ValueError("obj does not have the correct structure for an MSTextLayer")
-
     return MSTextLayer(text=obj["storage"],
                        usesNewLineSpacingBehaviour=obj["usesNewLineSpacingBehaviour"],
                        textBehaviour=obj["textBehaviour"],
@@ -312,61 +789,42 @@ def convert_MSTextLayer(obj):
                        isLocked=obj["isLocked"],
 
                        isFlippedHorizontal=obj["isFlippedHorizontal"],
-                       isFlippedVertical=obj["isFlippedVertical"])
+                       isFlippedVertical=obj["isFlippedVertical"],
+                       objectID=obj.get("do_objectID"))
 
 
-def is_NSTextStorage(obj):
-    if not isinstance(obj, dict):
-        return False
-    if "$class" not in obj.keys():
-        return False
-    if obj["$class"].get("$classname") not in ("NSTextStorage"):
-        return False
-
-    return True
+def _has_NSTextStorage_keys(obj):
+    return "NSString" in obj
 
 
-def convert_NSTextStorage(obj):
-    if not is_MSTextLayer(obj):
-        raise ValueError("obj does not have the correct structure for an MSTextLayer")
-
-    return MSTextLayer(text=obj["storage"],
-                       usesNewLineSpacingBehaviour=obj["usesNewLineSpacingBehaviour"],
-                       textBehaviour=obj["textBehaviour"],
-                       heightIsClipped=obj["heightIsClipped"],
-                       automaticallyDrawOnUnderlyingPath=obj["automaticallyDrawOnUnderlyingPath"],
+def is_NSTextStorage(obj):
+    return _is_archived(obj, ("NSTextStorage",))
 
-                       frame=obj["frame"],
-                       style=obj.get("style"),
-                       name=obj["name"],
-                       rotation=obj["rotation"],
 
-                       isVisible=obj["isVisible"],
-                       isLocked=obj["isLocked"],
+@register_converter("NSTextStorage", predicate=_has_NSTextStorage_keys)
+def convert_NSTextStorage(obj):
+    """
+    A text layer's storage, as its plain text: the attributes are not modelled yet,
+    and the delegate only refers back to the layer
+    """
+    text = obj["NSString"]
+    return text.decode("utf-8") if isinstance(text, bytes) else text
 
-                       isFlippedHorizontal=obj["isFlippedHorizontal"],
-                       isFlippedVertical=obj["isFlippedVertical"])
 
 ##############################################################
 #                  MSSHAPEPATHLAYER FUNCTIONS                #
 ##############################################################
-def is_MSShapePathLayer(obj):
-    if not isinstance(obj, dict):
-        return False
-    if "$class" not in obj.keys():
-        return False
-    if obj["$class"].get("$classname") not in ("MSRectangleShape", "MSStarShape",
-                                               "MSPolygonShape", "MSOvalShape",
-                                               "MSTriangleShape", "MSShapePathLayer"):
-        return False
+SHAPE_PATH_LAYER_CLASSES = ("MSRectangleShape", "MSStarShape",
+                            "MSPolygonShape", "MSOvalShape",
+                            "MSTriangleShape", "MSShapePathLayer")
 
-    return True
 
+def is_MSShapePathLayer(obj):
+    return _is_archived(obj, SHAPE_PATH_LAYER_CLASSES)
 
-def convert_MSShapePathLayer(obj):
-    if not is_MSShapePathLayer(obj):
-        raise ValueError("obj does not have the correct structure for an MSShapePathLayer")
 
+@register_converter(SHAPE_PATH_LAYER_CLASSES, model=MSShapePathLayer)
+def convert_MSShapePathLayer(obj):
     return MSShapePathLayer(path=obj["path"],
                             booleanOperation=obj["booleanOperation"],
 
@@ -379,49 +837,48 @@ def convert_MSShapePathLayer(obj):
                             isLocked=obj["isLocked"],
 
                             isFlippedHorizontal=obj["isFlippedHorizontal"],
-                            isFlippedVertical=obj["isFlippedVertical"])
+                            isFlippedVertical=obj["isFlippedVertical"],
+                            objectID=obj.get("do_objectID"))
 
 
 ##############################################################
 #                  MSSHAPEPATH FUNCTIONS                #
 ##############################################################
 def is_MSShapePath(obj):
-    if not isinstance(obj, dict):
-        return False
-    if "$class" not in obj.keys():
-        return False
-    if obj["$class"].get("$classname") not in ("MSShapePath"):
-        return False
-
-    return True
+    return _is_archived(obj, ("MSShapePath",))
 
 
+@register_converter("MSShapePath", leaf=True)
 def convert_MSShapePath(obj):
-    if not is_MSShapePath(obj):
-        raise ValueError("obj does not have the correct structure for an MSShapePath")
-
-    return MSShapePath(points=obj["points"],
-                       isClosed=obj["isClosed"])
+    """
+    Builds the path's arrays straight from the archived curve points: all of
+    their "{x, y}" strings are parsed in one go and no MSCurvePoint is converted.
+    """
+    table = obj.object_table
+    curve_points = [_raw_object(ref, table) for ref in _raw_list(obj.raw("points"), table)]
+    if any(_raw_classname(curve_point, table) != "MSCurvePoint" for curve_point in curve_points):
+        # Not a plain list of curve points: convert them one by one
+        return MSShapePath(points=obj["points"],
+                           isClosed=obj["isClosed"])
+
+    coordinates = parsePoints([_raw_text(curve_point[key], table)
+                               for curve_point in curve_points
+                               for key in ("point", "curveFrom", "curveTo")])
+    return MSShapePath.from_arrays(coordinates,
+                                   [_raw_object(curve_point["curveMode"], table) for curve_point in curve_points],
+                                   [_raw_object(curve_point["cornerRadius"], table) for curve_point in curve_points],
+                                   isClosed=obj["isClosed"])
 
 
 ##############################################################
 #                  MSCURVEPOINT FUNCTIONS                    #
 ##############################################################
 def is_MSCurvePoint(obj):
-    if not isinstance(obj, dict):
-        return False
-    if "$class" not in obj.keys():
-        return False
-    if obj["$class"].get("$classname") not in ("MSCurvePoint"):
-        return False
-
-    return True
+    return _is_archived(obj, ("MSCurvePoint",))
 
 
+@register_converter("MSCurvePoint")
 def convert_MSCurvePoint(obj):
-    if not is_MSCurvePoint(obj):
-        raise ValueError("obj does not have the correct structure for an MSCurvePoint")
-
     return MSCurvePoint(curveFrom=obj["curveFrom"],
                         curveTo=obj["curveTo"],
                         point=obj["point"],
@@ -433,20 +890,11 @@ def convert_MSCurvePoint(obj):
 #                  MSRECT FUNCTIONS                          #
 ##############################################################
 def is_MSRect(obj):
-    if not isinstance(obj, dict):
-        return False
-    if "$class" not in obj.keys():
-        return False
-    if obj["$class"].get("$classname") not in ("MSRect"):
-        return False
-
-    return True
+    return _is_archived(obj, ("MSRect",))
 
 
+@register_converter("MSRect")
 def convert_MSRect(obj):
-    if not is_MSRect(obj):
-        raise ValueError("obj does not have the correct structure for an MSRect")
-
     return MSRect(x=obj["x"],
                   y=obj["y"],
                   width=obj["width"],
@@ -469,64 +917,42 @@ def convert_MSRect(obj):
 #                  MSIMAGECOLLECTION FUNCTIONS               #
 ##############################################################
 def is_MSImageCollection(obj):
-    if not isinstance(obj, dict):
-        return False
-    if "$class" not in obj.keys():
-        return False
-    if obj["$class"].get("$classname") not in ("MSImageCollection"):
-        return False
-
-    return True
+    return _is_archived(obj, ("MSImageCollection",))
 
 
+@register_converter("MSImageCollection")
 def convert_MSImageCollection(obj):
-    if not is_MSImageCollection(obj):
-        raise ValueError("obj does not have the correct structure for an MSImageCollection")
-
     return MSImageCollection(images=obj["images"])
 
 
 ##############################################################
 #                  MSARRAY FUNCTIONS                         #
 ##############################################################
-def is_MSArray(obj):
-    if not isinstance(obj, dict):
-        return False
-    if "$class" not in obj.keys():
-        return False
-    if obj["$class"].get("$classname") not in ("MSArray"):
-        return False
-    if "array_do" not in obj.keys():
-        return False
+def _has_MSArray_keys(obj):
+    return "array_do" in obj
+
 
-    return True
+def is_MSArray(obj):
+    return _is_archived(obj, ("MSArray",))
 
 
+@register_converter("MSArray", predicate=_has_MSArray_keys)
 def convert_MSArray(obj):
-    if not is_MSArray(obj):
-        raise ValueError("obj does not have the correct structure for an MSArray")
-
     return obj["array_do"]
 
 
 ##############################################################
 #                  NSMUTABLEDICTIONARY FUNCTIONS             #
 ##############################################################
-def is_NSMutableDictionary(obj):
-    if not isinstance(obj, dict):
-        return False
-    if "$class" not in obj.keys():
-        return False
-    if obj["$class"].get("$classname") not in ("NSMutableDictionary", "NSDictionary"):
-        return False
-    if "NS.keys" not in obj.keys():
-        return False
-    if "NS.objects" not in obj.keys():
-        return False
+def _has_NSDictionary_keys(obj):
+    return "NS.keys" in obj and "NS.objects" in obj
 
-    return True
+
+def is_NSMutableDictionary(obj):
+    return _is_archived(obj, ("NSMutableDictionary", "NSDictionary"))
 
 
+@register_converter(("NSMutableDictionary", "NSDictionary"), predicate=_has_NSDictionary_keys)
 def convert_NSMutableDictionary(obj):
     """
     Converts an MSArchiver serialised NSMutableDictionary into
@@ -534,8 +960,6 @@ def convert_NSMutableDictionary(obj):
     as)
     """
 
-    if not is_NSMutableDictionary(obj):
-        raise ValueError("obj does not have the correct structure for a NSDictionary/NSMutableDictionary")
     keys = obj["NS.keys"]
     vals = obj["NS.objects"]
 
@@ -547,10 +971,14 @@ def convert_NSMutableDictionary(obj):
     if len(keys) != len(vals):
         raise ValueError("The length of the 'NS.keys' list ({0}) is not equal to that of the 'NS.objects ({1})".format(len(keys), len(vals)))
 
+    if len(set(keys)) != len(keys):
+        raise ValueError("The 'NS.keys' list contains duplicate entries")
+
+    if is_lazy(obj):
+        return MSArchiverDictionary(zip(keys, obj.raw("NS.objects")), obj.context)
+
     result = {}
     for i, k in enumerate(keys):
-        if k in result:
-            raise ValueError("The 'NS.keys' list contains duplicate entries")
         result[k] = vals[i]
 
     return result
@@ -560,8 +988,7 @@ def convert_NSMutableDictionary(obj):
 #                  NSARRAY FUNCTIONS                         #
 ##############################################################
 def has_individual_keys(raw_keys):
-    return reduce(lambda x, y: x or y,
-                  [key.startswith("NS.object.") for key in raw_keys])
+    return any(key.startswith("NS.object.") for key in raw_keys)
 
 
 def extract_individual_keys(raw_keys):
@@ -570,31 +997,26 @@ def extract_individual_keys(raw_keys):
     return individual_keys
 
 
-def is_NSArray(obj):
+def _has_NSArray_keys(obj):
     """
     An NSArray can either be a keyed as a list w/ "NS.objects" or have
     individual keys such as NS.object.0, NS.object.1, etc.
     """
-    if not isinstance(obj, dict):
-        return False
-    if "$class" not in obj.keys():
-        return False
-    if obj["$class"].get("$classname") not in ("NSArray", "NSMutableArray"):
-        return False
+    return "NS.objects" in obj or has_individual_keys(obj.keys())
 
-    if "NS.objects" not in obj.keys() and not has_individual_keys(obj.keys()):
-        return False
 
-    return True
+def is_NSArray(obj):
+    return _is_archived(obj, ("NSArray", "NSMutableArray"))
 
 
+@register_converter(("NSArray", "NSMutableArray"), predicate=_has_NSArray_keys)
 def convert_NSArray(obj):
-    if not is_NSArray(obj):
-        raise ValueError("obj does not have the correct structure for a NSArray/NSMutableArray")
-
     if has_individual_keys(obj.keys()):
         individual_keys = extract_individual_keys(obj.keys())
-        return [obj[key] for key in individual_keys]
+        items = _without_excluded([obj.raw(key) for key in individual_keys], obj.context)
+        if is_lazy(obj):
+            return MSArchiverList(items, obj.context)
+        return [MSArchiver_convert(item, obj.context) for item in items]
 
     return obj["NS.objects"]
 
@@ -602,70 +1024,53 @@ def convert_NSArray(obj):
 ##############################################################
 #                  NSSET FUNCTIONS                           #
 ##############################################################
-def is_NSSet(obj):
-    if not isinstance(obj, dict):
-        return False
-    if "$class" not in obj.keys():
-        return False
-    if obj["$class"].get("$classname") not in ("NSSet", "NSMutableSet"):
-        return False
-    if "NS.objects" not in obj.keys():
-        return False
+def _has_NSSet_keys(obj):
+    return "NS.objects" in obj
+
 
-    return True
+def is_NSSet(obj):
+    return _is_archived(obj, ("NSSet", "NSMutableSet"))
 
 
+@register_converter(("NSSet", "NSMutableSet"), predicate=_has_NSSet_keys)
 def convert_NSSet(obj):
-    if not is_NSSet(obj):
-        raise ValueError("obj does not have the correct structure for a NSSet/NSMutableSet")
-
     return set(obj["NS.objects"])
 
 
 ##############################################################
 #                  NSSTRING FUNCTIONS                        #
 ##############################################################
+def _has_NSString_keys(obj):
+    return "NS.string" in obj or "NS.bytes" in obj
+
+
 def is_NSString(obj):
-    if not isinstance(obj, dict):
-        return False
-    if "$class" not in obj.keys():
-        return False
-    if obj["$class"].get("$classname") not in ("NSString", "NSMutableString"):
-        return False
-    if "NS.string" not in obj.keys():
-        return False
-    return True
+    return _is_archived(obj, ("NSString", "NSMutableString"))
 
 
+@register_converter(("NSString", "NSMutableString"), predicate=_has_NSString_keys)
 def convert_NSString(obj):
-    if not is_NSString(obj):
-        raise ValueError("obj does not have the correct structure for a NSString/NSMutableString")
-
     # If it's a valid NSString
     if obj.get("NS.string"):
         return obj.get("NS.string")
 
-    return obj["NS.bytes"]
+    # Data may be a view of the payload; strings get their own copy. On Python 2
+    # bytes() is str(), which gives a memoryview's repr rather than its contents
+    data = obj["NS.bytes"]
+    return data.tobytes() if isinstance(data, memoryview) else bytes(data)
 
 
 ##############################################################
 #                  NSDATE FUNCTIONS                          #
 ##############################################################
-def is_NSDate(obj):
-    if not isinstance(obj, dict):
-        return False
-    if "$class" not in obj.keys():
-        return False
-    if obj["$class"].get("$classname") not in ("NSDate"):
-        return False
-    if "NS.time" not in obj.keys():
-        return False
+def _has_NSDate_keys(obj):
+    return "NS.time" in obj
 
-    return True
 
+def is_NSDate(obj):
+    return _is_archived(obj, ("NSDate",))
 
-def convert_NSDate(obj):
-    if not is_NSDate(obj):
-        raise ValueError("obj does not have the correct structure for a NSDate")
 
+@register_converter("NSDate", predicate=_has_NSDate_keys)
+def convert_NSDate(obj):
     return datetime.datetime(2001, 1, 1) + datetime.timedelta(seconds=obj["NS.time"])
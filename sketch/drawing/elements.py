@@ -103,9 +103,8 @@ class Group(Element):
     def draw(self, surface):
         """ Draws the group to a new context of the given Surface """
 
+        m = self.matrix
         for e in self.elements:
-            m = self.matrix
-            mi = np.linalg.inv(m)
             new_matrix = m.dot(e.matrix)
             e.set_matrix(new_matrix).draw(surface)
 
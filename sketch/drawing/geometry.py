@@ -39,3 +39,43 @@ def polar2cart(r, theta):
 
     res = r * np.array([np.cos(theta), np.sin(theta)])
     return res if len(res.shape) == 1 else res.T
+
+
+def layer_matrices(x, y, width, height, rotation, flippedHorizontal, flippedVertical):
+    """ Returns the (N, 3, 3) matrices taking points from each layer's own coordinates
+    (origin at the top left of its frame) to those of its parent. As in Sketch, layers
+    are flipped and then rotated (degrees, counter-clockwise) about their frame's center.
+    Arguments are arrays of N values, or single values.
+    """
+    x, y, width, height, rotation = np.broadcast_arrays(
+        *(np.atleast_1d(np.asarray(a, dtype=np.float64)) for a in (x, y, width, height, rotation)))
+    sx = np.where(flippedHorizontal, -1.0, 1.0)
+    sy = np.where(flippedVertical, -1.0, 1.0)
+    # y points down, so counter-clockwise on screen is a negative angle
+    a = -np.radians(rotation)
+    cos, sin = np.cos(a), np.sin(a)
+
+    matrices = np.zeros((len(x), 3, 3))
+    matrices[:, 0, 0] = cos * sx
+    matrices[:, 0, 1] = -sin * sy
+    matrices[:, 1, 0] = sin * sx
+    matrices[:, 1, 1] = cos * sy
+    half_width, half_height = width / 2, height / 2
+    matrices[:, 0, 2] = x + half_width - matrices[:, 0, 0] * half_width - matrices[:, 0, 1] * half_height
+    matrices[:, 1, 2] = y + half_height - matrices[:, 1, 0] * half_width - matrices[:, 1, 1] * half_height
+    matrices[:, 2, 2] = 1.0
+    return matrices
+
+
+def bounding_boxes(matrices, width, height):
+    """ Returns the (N, 4) minX, minY, maxX, maxY boxes around rectangles of the given
+    sizes, with their origin at (0, 0), once transformed by (N, 3, 3) matrices.
+    """
+    width = np.asarray(width, dtype=np.float64)
+    height = np.asarray(height, dtype=np.float64)
+    zeros = np.zeros_like(width)
+    corners_x = np.array([zeros, width, zeros, width]).T
+    corners_y = np.array([zeros, zeros, height, height]).T
+    xs = matrices[:, 0, 0, None] * corners_x + matrices[:, 0, 1, None] * corners_y + matrices[:, 0, 2, None]
+    ys = matrices[:, 1, 0, None] * corners_x + matrices[:, 1, 1, None] * corners_y + matrices[:, 1, 2, None]
+    return np.column_stack([xs.min(axis=1), ys.min(axis=1), xs.max(axis=1), ys.max(axis=1)])
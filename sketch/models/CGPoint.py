@@ -1,4 +1,9 @@
-class CGPoint(object):
+from sketch.models.SlottedObject import SlottedObject
+
+
+class CGPoint(SlottedObject):
+    __slots__ = ("_x", "_y")
+
     def __init__(self, x, y):
         self._x = x
         self._y = y
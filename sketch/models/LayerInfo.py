@@ -0,0 +1,10 @@
+from collections import namedtuple
+
+
+class LayerInfo(namedtuple("LayerInfo", ["classname", "objectID", "name", "isVisible", "isLocked", "depth"])):
+    """
+    What MSDocumentData.walk knows about a page or layer before converting it: its
+    archived $classname (the model class's name for layers made in code), objectID,
+    name and flags, and its depth (0 for pages).
+    """
+    pass
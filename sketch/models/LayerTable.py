@@ -0,0 +1,174 @@
+import numpy as np
+
+from sketch.drawing.geometry import bounding_boxes, layer_matrices
+from sketch.models.MSLayer import MSLayer
+from sketch.models.MSLayerGroup import MSLayerGroup
+
+
+class LayerTable(object):
+    """
+    Every layer of a document as one row of a set of columns, for vectorized queries
+    over many layers at once (see MSDocumentData.layer_table):
+
+        table = document.layer_table()
+        wide = table.layers_where(table.isVisible & (table.width > 100) & (table.page == 2))
+
+    Rows are in document order, each page followed by its layers depth first. Pages
+    are rows too, at depth 0 and with no parent.
+
+        objectID, name                  object
+        parent                          int: row of the enclosing group or page, -1 for pages
+        page                            int: index of the page in MSDocumentData.pages
+        depth                           int
+        classCode                       int: index into classNames, the names of
+                                        the layers' model classes
+        classSetCode                    int: index into classSets, the frozensets of
+                                        classnames the layers go by in walk, select
+                                        and layers_of_class (see layer_classnames())
+        x, y, width, height             float: the frame, relative to the parent
+        rotation                        float
+        isVisible, isLocked,
+        isFlippedHorizontal,
+        isFlippedVertical               bool
+
+    Layers that were left as plain dictionaries (classes without a converter) are
+    included, with the values their dictionary has.
+
+    The table is a snapshot: it does not follow later changes to the layers (but see
+    MSDocumentData.layer_table).
+    """
+
+    _FLAGS = ("isVisible", "isLocked", "isFlippedHorizontal", "isFlippedVertical")
+
+    def __init__(self, pages):
+        layers = []
+        objectIDs, names, parents, page_indices, depths, class_codes = [], [], [], [], [], []
+        frames, rotations = [], []
+        flags = []
+        classNames = []
+        class_index = {}
+        set_codes, classSets = [], []
+        set_index = {}
+
+        stack = [(page, -1, page_index, 0) for page_index, page in reversed(list(enumerate(pages)))]
+        while stack:
+            layer, parent, page_index, depth = stack.pop()
+            row = len(layers)
+            layers.append(layer)
+
+            classname, objectID, name, frame, rotation, values, children = _layer_values(layer)
+            if classname not in class_index:
+                class_index[classname] = len(classNames)
+                classNames.append(classname)
+            classnames = layer._classnames() if isinstance(layer, MSLayer) else frozenset((classname,))
+            if classnames not in set_index:
+                set_index[classnames] = len(classSets)
+                classSets.append(classnames)
+
+            objectIDs.append(objectID)
+            names.append(name)
+            parents.append(parent)
+            page_indices.append(page_index)
+            depths.append(depth)
+            class_codes.append(class_index[classname])
+            set_codes.append(set_index[classnames])
+            frames.append(frame)
+            rotations.append(rotation)
+            flags.append(values)
+
+            for child in MSLayerGroup._reversed_layers(children):
+                stack.append((child, row, page_index, depth + 1))
+
+        self.layers = layers
+        self.classNames = tuple(classNames)
+        self.classSets = tuple(classSets)
+
+        self.objectID = _object_array(objectIDs)
+        self.name = _object_array(names)
+        self.parent = np.array(parents, dtype=np.int64)
+        self.page = np.array(page_indices, dtype=np.int64)
+        self.depth = np.array(depths, dtype=np.int64)
+        self.classCode = np.array(class_codes, dtype=np.int64)
+        self.classSetCode = np.array(set_codes, dtype=np.int64)
+
+        frames = np.array(frames, dtype=np.float64).reshape(-1, 4)
+        self.x, self.y, self.width, self.height = frames.T
+        self.rotation = np.array(rotations, dtype=np.float64)
+
+        flags = np.array(flags, dtype=bool).reshape(-1, len(self._FLAGS))
+        self.isVisible, self.isLocked, self.isFlippedHorizontal, self.isFlippedVertical = flags.T
+
+    def __len__(self):
+        return len(self.layers)
+
+    def class_mask(self, *classnames):
+        """
+        A boolean mask of the rows whose layers go by any of the given classnames, e.g.
+        "MSTextLayer": their model class or one of its bases, or their archived $classname
+        """
+        codes = [code for code, names in enumerate(self.classSets) if not names.isdisjoint(classnames)]
+        return np.in1d(self.classSetCode, codes)
+
+    def layers_where(self, mask):
+        """
+        The layers of the rows selected by mask, in document order.
+        :param mask: A boolean mask or an array of row indices
+        """
+        rows = np.asarray(mask)
+        if rows.dtype == bool:
+            rows = np.flatnonzero(rows)
+        return [self.layers[row] for row in rows]
+
+    def absolute_matrices(self):
+        """
+        The (N, 3, 3) matrices from each layer's own coordinates to those of its page,
+        taking into account its frame, rotation and flips and those of its parents.
+        Pages are the identity: their layers are positioned in page coordinates.
+        """
+        matrices = layer_matrices(self.x, self.y, self.width, self.height, self.rotation,
+                                  self.isFlippedHorizontal, self.isFlippedVertical)
+        matrices[self.depth == 0] = np.eye(3)
+        # Parents have smaller depths, so one level at a time has every parent ready
+        for depth in range(2, self.depth.max() + 1 if len(self) else 0):
+            rows = np.flatnonzero(self.depth == depth)
+            matrices[rows] = np.einsum("nij,njk->nik", matrices[self.parent[rows]], matrices[rows])
+        return matrices
+
+    def absolute_bounds(self):
+        """
+        The (N, 4) minX, minY, maxX, maxY boxes around the layers in page coordinates.
+        Rows without a frame are NaN.
+        """
+        return bounding_boxes(self.absolute_matrices(), self.width, self.height)
+
+    def __repr__(self):
+        return "<LayerTable {0} layers, {1} classes>".format(len(self), len(self.classNames))
+
+
+def _object_array(values):
+    # np.array() would make a string array out of a list of strings, or a 2d array out of sequences
+    array = np.empty(len(values), dtype=object)
+    array[:] = values
+    return array
+
+
+def _layer_values(layer):
+    """ (classname, objectID, name, frame, rotation, flags, children) of a layer, converted or not """
+    if isinstance(layer, MSLayer):
+        frame = layer.frame
+        return (type(layer).__name__, layer.objectID, layer.name,
+                (frame.x, frame.y, frame.width, frame.height), layer.rotation,
+                (layer.isVisible, layer.isLocked, layer.isFlippedHorizontal, layer.isFlippedVertical),
+                getattr(layer, "layers", None))
+
+    # A layer without a converter: still an archived dictionary
+    frame = layer.get("frame")
+    if hasattr(frame, "width"):
+        frame = (frame.x, frame.y, frame.width, frame.height)
+    else:
+        frame = (np.nan,) * 4
+    children = layer.get("layers")
+    return (layer["$class"]["$classname"], layer.get("do_objectID"), layer.get("name"),
+            frame, layer.get("rotation", 0.0),
+            tuple(bool(layer.get(flag, flag == "isVisible")) for flag in LayerTable._FLAGS),
+            children if isinstance(children, list) else None)
@@ -2,6 +2,7 @@ from sketch.models.MSLayerGroup import MSLayerGroup
 
 
 class MSArtboardGroup(MSLayerGroup):
+    __slots__ = ()
 
     @property
     def frame(self):
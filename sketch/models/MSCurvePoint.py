@@ -1,4 +1,7 @@
+import numpy as np
+
 from sketch.models.CGPoint import CGPoint
+from sketch.models.SlottedObject import SlottedObject
 
 
 def parsePoint(storedPt):
@@ -8,27 +11,94 @@ def parsePoint(storedPt):
     return tuple(float(c) for c in storedPt.strip("{}").split(","))
 
 
-class MSCurvePoint(object):
+def parsePoints(storedPts):
+    """
+    Translates a sequence of strings of the form "{1, 0}" into an (N, 2) float
+    array, parsing all of them in a single pass
+    """
+    text = ",".join(storedPts).replace("{", "").replace("}", "")
+    coordinates = np.fromstring(text, dtype=np.float64, sep=",") if storedPts else np.empty(0)
+    if len(coordinates) != 2 * len(storedPts):
+        raise ValueError("Expected a pair of coordinates in each point")
+    return coordinates.reshape(-1, 2)
+
+
+# Rows of a curve point's coordinates, see MSShapePath
+POINT, CURVE_FROM, CURVE_TO = range(3)
+
+
+class MSCurvePoint(SlottedObject):
+    """
+    A point of an MSShapePath with its two control points. Curve points of a path
+    are views of a row of the path's arrays (see MSShapePath.points), so reading and
+    setting their attributes reads and writes the path. A curve point built on its
+    own keeps a single row of its own.
+    """
+    __slots__ = ("_coordinates", "_curveModes", "_cornerRadii", "_index")
 
     def __init__(self, curveFrom, curveTo, point, curveMode, cornerRadius):
         # curveFrom, curveTo are stored as <unicode> in the form "{x, y}"
         assert isinstance(curveFrom, unicode)
-        (x, y) = parsePoint(curveFrom)
-        self.curveFrom = CGPoint(x, y)
-
         assert isinstance(curveTo, unicode)
-        (x, y) = parsePoint(curveTo)
-        self.curveTo = CGPoint(x, y)
-
         assert isinstance(point, unicode)
-        (x, y) = parsePoint(point)
-        self.point = CGPoint(x, y)
+        self._coordinates = [[list(parsePoint(point)), list(parsePoint(curveFrom)), list(parsePoint(curveTo))]]
 
         assert isinstance(curveMode, int)
-        self._curveMode = curveMode
+        self._curveModes = [curveMode]
 
         assert isinstance(cornerRadius, float)
-        self._cornerRadius = cornerRadius
+        self._cornerRadii = [cornerRadius]
+
+        self._index = 0
+
+    @classmethod
+    def view(cls, coordinates, curveModes, cornerRadii, index):
+        """ A curve point reading and writing row `index` of the given arrays """
+        curve_point = cls.__new__(cls)
+        curve_point._coordinates = coordinates
+        curve_point._curveModes = curveModes
+        curve_point._cornerRadii = cornerRadii
+        curve_point._index = index
+        return curve_point
+
+    def _get(self, row):
+        x, y = self._coordinates[self._index][row]
+        return CGPoint(float(x), float(y))
+
+    def _set(self, row, point):
+        self._coordinates[self._index][row] = [point.x, point.y] if isinstance(point, CGPoint) else list(point)
+
+    @property
+    def point(self):
+        return self._get(POINT)
+
+    @point.setter
+    def point(self, point):
+        self._set(POINT, point)
+
+    @property
+    def curveFrom(self):
+        return self._get(CURVE_FROM)
+
+    @curveFrom.setter
+    def curveFrom(self, point):
+        self._set(CURVE_FROM, point)
+
+    @property
+    def curveTo(self):
+        return self._get(CURVE_TO)
+
+    @curveTo.setter
+    def curveTo(self, point):
+        self._set(CURVE_TO, point)
+
+    @property
+    def curveMode(self):
+        return int(self._curveModes[self._index])
+
+    @property
+    def cornerRadius(self):
+        return float(self._cornerRadii[self._index])
 
     def __repr__(self):
         return "<MSCurvePoint curveFrom: {curveFrom} curveTo: {curveTo} point: {point}".format(
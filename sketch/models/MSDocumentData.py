@@ -1,4 +1,10 @@
+from sketch.models.LayerInfo import LayerInfo
+from sketch.models.LayerTable import LayerTable, _layer_values
+from sketch.models.MSLayer import MSLayer
+from sketch.models.MSLayerGroup import MSLayerGroup
 from sketch.models.MSObject import MSObject
+from sketch.models.MSPage import MSPage
+from sketch.models.Selector import compile_selector
 
 
 class MSDocumentData(MSObject):
@@ -21,6 +27,20 @@ class MSDocumentData(MSObject):
         self._layerSymbols = layerSymbols
         self._layerTextStyles = layerTextStyles
 
+        self._layerTable = None
+
+        # objectID -> layer, name -> [layers] and class -> [layers], see _indexes()
+        self._layersByID = None
+        self._layersByName = None
+        self._layersByClass = None
+
+        # As for layers (see MSLayerGroup), without converting the pages of a lazy list
+        lazy = hasattr(pages, "on_convert")
+        for page in pages.converted() if lazy else pages:
+            self._adopt(page)
+        if lazy:
+            pages.on_convert = self._adopt
+
         super(MSDocumentData, self).__init__(objectID)
 
     @property
@@ -63,6 +83,131 @@ class MSDocumentData(MSObject):
         """ <dict> """
         return self._layerTextStyles
 
+    def _adopt(self, page):
+        if isinstance(page, MSPage):
+            page._documentData = self
+
+    def layer_table(self, rebuild=False):
+        """
+        The document's layers as columns of NumPy arrays, see LayerTable. Built in
+        a single pass over the pages the first time it is asked for, then cached until
+        a layer is added, removed or has its frame changed.
+        :param rebuild: Build the table again even so
+        """
+        if self._layerTable is None or rebuild:
+            self._layerTable = LayerTable(self.pages)
+        return self._layerTable
+
+    def layer_with_id(self, objectID):
+        """ The page or layer with the given objectID, or None """
+        return self._indexes()[0].get(objectID)
+
+    def layers_named(self, name):
+        """ The pages and layers with the given name, in document order """
+        return list(self._indexes()[1].get(name, ()))
+
+    def layers_of_class(self, classname):
+        """
+        The pages and layers of the given class, e.g. "MSTextLayer", in document order.
+        Classes match as in walk and select: a layer is listed under its model class and
+        its bases and under the $classname it was archived with (see LayerTable.classSets).
+        """
+        return list(self._indexes()[2].get(classname, ()))
+
+    def select(self, selector):
+        """
+        Yields the pages and layers matching a CSS-like selector, in document order.
+        See Selector for the syntax.
+
+            document.select("MSPage[name=Home] MSLayerGroup:visible > MSTextLayer[name^=Title]")
+
+        Selectors are compiled once and reused. A single compound selector with an
+        #objectID is answered from the objectID index, and one with a class from the
+        layer table, when those have been built already; anything else walks the pages.
+        """
+        selector = compile_selector(selector)
+        if selector.is_simple:
+            compound = selector.compounds[0]
+            if compound.objectID is not None and self._layersByID is not None:
+                layer = self._layersByID.get(compound.objectID)
+                return selector.filter([layer] if layer is not None else [])
+            if compound.classname not in (None, "*") and self._layerTable is not None:
+                table = self._layerTable
+                return selector.filter(table.layers_where(table.class_mask(compound.classname)))
+        return selector.select(self.pages)
+
+    def walk(self, prune=None, classes=None):
+        """
+        Yields the pages and every layer below them, in document order, without recursion.
+
+            hidden = document.walk(prune=lambda info: info.isVisible, classes=("MSTextLayer",))
+
+        :param prune: Called with a LayerInfo for each page and layer; if it returns True,
+                      that page or layer and everything below it is skipped
+        :param classes: Classnames of the pages and layers to yield, e.g. ("MSTextLayer",);
+                        the others are walked through. All of them if None
+
+        Classnames are those of the archive ($classname, e.g. "MSShapeGroup"), in the
+        LayerInfo as in classes, but classes matches the names of the model class and
+        its bases too (e.g. "MSLayerGroup", or "MSLayer" for every layer), however the
+        document was read.
+
+        In a document read with lazy=True, the LayerInfo is read from the archive and
+        only the pages and layers that are yielded are converted, along with the layers
+        below any group yielded.
+        """
+        if hasattr(self._pages, "walk"):
+            return self._pages.walk(prune, classes)
+        return _walk(self._pages, prune, classes)
+
+    def _indexes(self):
+        """
+        The objectID, name and class indexes, built together on first use from the layer
+        table and kept up to date by addLayer and removeLayer. Layers added later come
+        after the others in the name and class indexes.
+        """
+        if self._layersByID is None:
+            self._layersByID, self._layersByName, self._layersByClass = {}, {}, {}
+            self._index(self.layer_table())
+        return self._layersByID, self._layersByName, self._layersByClass
+
+    def _index(self, table):
+        for layer, objectID, name, classSetCode in zip(table.layers, table.objectID, table.name, table.classSetCode):
+            if objectID is not None:
+                self._layersByID[objectID] = layer
+            self._layersByName.setdefault(name, []).append(layer)
+            for classname in table.classSets[classSetCode]:
+                self._layersByClass.setdefault(classname, []).append(layer)
+
+    def _unindex(self, table):
+        removed = set(map(id, table.layers))
+        for objectID in table.objectID:
+            if objectID is not None and id(self._layersByID.get(objectID)) in removed:
+                del self._layersByID[objectID]
+        classnames = set()
+        for code in set(table.classSetCode.tolist()):
+            classnames.update(table.classSets[code])
+        for index, keys in ((self._layersByName, table.name), (self._layersByClass, classnames)):
+            for key in set(keys):
+                remaining = [layer for layer in index[key] if id(layer) not in removed]
+                if remaining:
+                    index[key] = remaining
+                else:
+                    del index[key]
+
+    def _layersChanged(self, added=None, removed=None):
+        """
+        Called by the pages when a layer, with its subtree, is added or removed, and
+        with neither when a layer's frame changes
+        """
+        self._layerTable = None
+        if self._layersByID is None:
+            return
+        if removed is not None:
+            self._unindex(LayerTable([removed]))
+        if added is not None:
+            self._index(LayerTable([added]))
+
     def __repr__(self):
         return '<MSDocumentData \n\
                 objectID: {objectID}\n\
@@ -84,3 +229,23 @@ class MSDocumentData(MSObject):
                     layerSymbols=self.layerSymbols,
                     layerTextStyles=self.layerTextStyles,
                 )
+
+
+def _walk(pages, prune, classes):
+    """ MSDocumentData.walk over converted pages """
+    if isinstance(classes, basestring):
+        classes = (classes,)
+    classes = frozenset(classes) if classes is not None else None
+
+    stack = [(page, 0) for page in reversed(pages)]
+    while stack:
+        layer, depth = stack.pop()
+        classname, objectID, name, frame, rotation, flags, children = _layer_values(layer)
+        if isinstance(layer, MSLayer):
+            classname = layer._classname or classname
+        if prune is not None and prune(LayerInfo(classname, objectID, name, flags[0], flags[1], depth)):
+            continue
+        if classes is None or classname in classes or (
+                isinstance(layer, MSLayer) and not classes.isdisjoint(layer._classnames())):
+            yield layer
+        stack.extend((child, depth + 1) for child in MSLayerGroup._reversed_layers(children))
@@ -1,14 +1,48 @@
+import numpy as np
+
+from sketch.drawing.geometry import bounding_boxes, layer_matrices
+from sketch.models.GKRect import GKRect
 from sketch.models.MSRect import MSRect
 from sketch.models.MSStyle import MSStyle
+from sketch.models.SlottedObject import SlottedObject
+
+
+_IDENTITY = np.eye(3)
+
+# layer_classnames() by (model class, archived $classname)
+_CLASSNAMES = {}
+
+
+def layer_classnames(model, classname=None):
+    """
+    The classnames a layer of the given model class goes by in MSDocumentData.walk,
+    select and layers_of_class: those of the class and its bases, and the $classname
+    it was archived with, if any (e.g. an MSShapeGroup is an MSLayerGroup)
+    """
+    key = (model, classname)
+    classnames = _CLASSNAMES.get(key)
+    if classnames is None:
+        classnames = [cls.__name__ for cls in model.__mro__]
+        if classname is not None:
+            classnames.append(classname)
+        classnames = _CLASSNAMES[key] = frozenset(classnames)
+    return classnames
+
 
+class MSLayer(SlottedObject):
+    __slots__ = ("_frame", "_style", "_name", "_rotation",
+                 "_isVisible", "_isLocked",
+                 "_isFlippedHorizontal", "_isFlippedVertical",
+                 "_objectID", "_classname", "_parent", "_absoluteTransform")
 
-class MSLayer(object):
     def __init__(self, frame, style, name, rotation,
                  isVisible, isLocked,
-                 isFlippedHorizontal, isFlippedVertical):
+                 isFlippedHorizontal, isFlippedVertical,
+                 objectID=None):
 
         assert isinstance(frame, MSRect)
         self._frame = frame
+        frame._owner = self
 
         # assert isinstance(style, MSStyle)
         self._style = style
@@ -30,6 +64,15 @@ class MSLayer(object):
         self._isFlippedHorizontal = isFlippedHorizontal
         self._isFlippedVertical = isFlippedVertical
 
+        self._objectID = objectID
+        # The archive's $classname, set by the converter (see sketch.converter)
+        self._classname = None
+
+        # Set by the enclosing group, see MSLayerGroup
+        self._parent = None
+        # (matrix, the parent's matrix it was computed from), see absoluteTransform
+        self._absoluteTransform = None
+
         super(MSLayer, self).__init__()
 
     def to_cairo():
@@ -63,6 +106,13 @@ class MSLayer(object):
         """
         return self._style
 
+    @property
+    def objectID(self):
+        """
+        The layer's unique identifier, or None if the document has none for it. <str>
+        """
+        return self._objectID
+
     @property
     def name(self):
         """
@@ -109,10 +159,10 @@ class MSLayer(object):
     def parentGroup(self):
         """
         Returns the parent group of this layer. Note that this can return an
-        MSPage or MSArtboardGroup as well as an MSLayerGroup
+        MSPage or MSArtboardGroup as well as an MSLayerGroup. None for pages and
+        for layers of groups that were left unconverted.
         """
-        # Not implemented
-        pass
+        return self._parent
 
     @property
     def isSelected(self):
@@ -136,9 +186,61 @@ class MSLayer(object):
         Returns a GKRect object that returns the bounds of this layer in absolute coordinates;
         it takes into account the layer's rotation and that of any of its parents. (readonly)
         """
-        # Not implemented
+        minX, minY, maxX, maxY = bounding_boxes(self.absoluteTransform()[None], self.frame.width,
+                                                self.frame.height)[0]
+        return GKRect(minX, minY, maxX - minX, maxY - minY)
+
+    def absoluteTransform(self):
+        """
+        Returns the 3x3 matrix taking points from this layer's own coordinates (origin at
+        the top left of its frame) to those of its page.
+
+        Each layer caches its matrix along with the parent matrix it was computed from.
+        Changing a frame only drops that layer's matrix; its descendants notice that their
+        parent's matrix is a new one the next time they are asked, so moving a group
+        recomputes the matrices of that group's subtree and nothing else.
+        """
+        # Iterative, to cope with deeply nested groups
+        chain = []
+        layer = self
+        while layer is not None:
+            chain.append(layer)
+            layer = layer._parent
+
+        matrix = _IDENTITY
+        for layer in reversed(chain):
+            cached = layer._absoluteTransform
+            if cached is None or cached[1] is not matrix:
+                cached = (matrix.dot(layer._localTransform()), matrix)
+                layer._absoluteTransform = cached
+            matrix = cached[0]
+        return matrix
+
+    def _localTransform(self):
+        """ The matrix from this layer's coordinates to those of its parent """
+        frame = self.frame
+        return layer_matrices(frame.x, frame.y, frame.width, frame.height, self.rotation,
+                              self.isFlippedHorizontal, self.isFlippedVertical)[0]
+
+    def _frameChanged(self):
+        # Called by the frame's mutators
+        self._absoluteTransform = None
+        self._rootGroup()._descendantMoved()
+
+    def _rootGroup(self):
+        group = self
+        while group._parent is not None:
+            group = group._parent
+        return group
+
+    def _descendantMoved(self):
+        """ Called on the outermost group when the frame of a layer in its subtree changes """
         pass
 
+    def _classnames(self):
+        """ The classnames the layer goes by, see layer_classnames() """
+        return layer_classnames(type(self), self._classname)
+
     def duplicate(self):
         """
         Duplicates the layer and insert the copy above itself.
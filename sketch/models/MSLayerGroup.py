@@ -2,17 +2,37 @@ from sketch.models.MSLayer import MSLayer
 
 
 class MSLayerGroup(MSLayer):
+    __slots__ = ("_layers",)
+
     def __init__(self, layers,
                  frame, style, name, rotation,
                  isVisible, isLocked,
-                 isFlippedHorizontal, isFlippedVertical):
+                 isFlippedHorizontal, isFlippedVertical,
+                 objectID=None):
 
         assert isinstance(layers, list)
         self._layers = layers
+        # Links the layers converted already, without converting a lazy list's others;
+        # those are linked as they get converted
+        lazy = hasattr(layers, "on_convert")
+        for layer in layers.converted() if lazy else layers:
+            self._adopt(layer)
+        if lazy:
+            layers.on_convert = self._adopt
 
         super(MSLayerGroup, self).__init__(frame, style, name, rotation,
                                            isVisible, isLocked,
-                                           isFlippedHorizontal, isFlippedVertical)
+                                           isFlippedHorizontal, isFlippedVertical,
+                                           objectID=objectID)
+
+    @staticmethod
+    def _reversed_layers(layers):
+        """
+        The items of a layer list (or None), last first, for depth first walks that
+        push them onto a stack. Going through list() converts a lazily converted
+        list's items and links them to their group, which reversed() would skip.
+        """
+        return reversed(list(layers or ()))
 
     def to_cairo(self):
         from sketch.drawing.elements import Group
@@ -61,16 +81,39 @@ class MSLayerGroup(MSLayer):
 
     def addLayer(self, layer):
         """
-        Add a layer to this group.
+        Add a layer to this group, removing it from the group it was in, if any.
         """
-        # Not implemented
-        pass
+        assert isinstance(layer, MSLayer)
+        group = self
+        while group is not None:
+            if group is layer:
+                raise ValueError("Cannot add {0!r} to itself or to a layer inside it".format(layer.name))
+            group = group._parent
+        if layer._parent is not None:
+            layer._parent.removeLayer(layer)
+        self._layers.append(layer)
+        layer._parent = self
+        self._rootGroup()._descendantsChanged(added=layer)
 
     def removeLayer(self, layer):
         """
         Remove a layer from this group.
         """
-        # Not implemented
+        for index, child in enumerate(self._layers):
+            if child is layer:
+                break
+        else:
+            raise ValueError("{0!r} is not a layer of this group".format(layer.name))
+        del self._layers[index]
+        layer._parent = None
+        self._rootGroup()._descendantsChanged(removed=layer)
+
+    def _adopt(self, layer):
+        if isinstance(layer, MSLayer) and layer._parent is None:
+            layer._parent = self
+
+    def _descendantsChanged(self, added=None, removed=None):
+        """ Called on the outermost group when a layer is added to or removed from its subtree """
         pass
 
     def addLayerOfType(self, type):
@@ -1,5 +1,10 @@
+import numpy as np
+
+from sketch.models.GKRect import GKRect
+from sketch.models.LayerTable import LayerTable
 from sketch.models.MSLayerGroup import MSLayerGroup
 from sketch.models.MSRulerData import MSRulerData
+from sketch.models.SpatialIndex import SpatialIndex
 
 
 class MSPage(MSLayerGroup):
@@ -10,23 +15,30 @@ class MSPage(MSLayerGroup):
 
     However do check out MSLayerGroup as there are useful methods in there as well.
     """
+    __slots__ = ("_horizontalRulerData", "_verticalRulerData", "_spatialIndex", "_documentData")
 
     def __init__(self,
                  horizontalRulerData,  verticalRulerData,
                  layers,  # inherited from MSLayerGroup
                  frame, style, name, rotation,
                  isVisible, isLocked,
-                 isFlippedHorizontal, isFlippedVertical):
+                 isFlippedHorizontal, isFlippedVertical,
+                 objectID=None):
 
         # assert isinstance(horizontalRulerData, MSRulerData)
         # assert isinstance(verticalRulerData, MSRulerData)
         self._horizontalRulerData = horizontalRulerData
         self._verticalRulerData = verticalRulerData
 
+        self._spatialIndex = None
+        # Set by the MSDocumentData the page belongs to
+        self._documentData = None
+
         super(MSPage, self).__init__(layers,
                                      frame, style, name, rotation,
                                      isVisible, isLocked,
-                                     isFlippedHorizontal, isFlippedVertical)
+                                     isFlippedHorizontal, isFlippedVertical,
+                                     objectID=objectID)
 
     def render(self):
         from sketch.drawing.surfaces import Surface
@@ -45,13 +57,61 @@ class MSPage(MSLayerGroup):
         print "Writing to png...%s" % self.frame
         surface.write_to_png("/Users/shravan/Desktop/output.png")
 
+    def _localTransform(self):
+        # Layers are positioned in page coordinates, whatever the page's frame says
+        return np.eye(3)
+
     @property
     def contentBounds(self):
         """
         If you want a rectangle around everything on the canvas, use this. It returns a
         GKRect object that you can use to export from. See the Exporting section for examples.
+        None if the page has no layers.
         """
-        pass
+        bounds = self.spatial_index().bounds
+        if bounds is None:
+            return None
+        minX, minY, maxX, maxY = bounds
+        return GKRect(minX, minY, maxX - minX, maxY - minY)
+
+    def spatial_index(self, rebuild=False):
+        """
+        A SpatialIndex over the absolute bounds of every layer on the page, at any depth.
+        Built the first time it is asked for, then cached until a layer on the page is
+        added, removed or has its frame changed.
+        :param rebuild: Build the index again even so
+        """
+        if self._spatialIndex is None or rebuild:
+            table = LayerTable([self])
+            bounds = table.absolute_bounds()
+            rows = np.flatnonzero((table.depth > 0) & ~np.isnan(bounds).any(axis=1))
+            self._spatialIndex = SpatialIndex(bounds[rows], [table.layers[row] for row in rows])
+        return self._spatialIndex
+
+    def layers_at(self, x, y):
+        """
+        Returns the layers, at any depth, whose absolute bounds contain the point (x, y),
+        in document order.
+        """
+        return self.spatial_index().at(x, y)
+
+    def layers_in(self, rect, contained=False):
+        """
+        Returns the layers, at any depth, whose absolute bounds intersect rect, or
+        lie entirely inside it if contained is True, in document order.
+        :param rect: An MSRect or GKRect in page coordinates
+        """
+        box = (rect.x, rect.y, rect.x + rect.width, rect.y + rect.height)
+        if contained:
+            return self.spatial_index().contained_in(*box)
+        return self.spatial_index().intersecting(*box)
+
+    def nearest_layers(self, x, y, count=1):
+        """
+        Returns the count layers whose absolute bounds are nearest to the point (x, y),
+        nearest first. Layers containing the point are at distance 0.
+        """
+        return [layer for distance, layer in self.spatial_index().nearest(x, y, count)]
 
     @property
     def exportableLayers(self):
@@ -72,8 +132,17 @@ class MSPage(MSLayerGroup):
         """
         Adds an MSLayer to the page.
         """
-        # Not implemented
-        pass
+        super(MSPage, self).addLayer(layer)
+
+    def _descendantMoved(self):
+        self._spatialIndex = None
+        if self._documentData is not None:
+            self._documentData._layersChanged()
+
+    def _descendantsChanged(self, added=None, removed=None):
+        self._spatialIndex = None
+        if self._documentData is not None:
+            self._documentData._layersChanged(added=added, removed=removed)
 
     @property
     def slices(self):
@@ -1,16 +1,26 @@
-from sketch.models import CGPoint
+from sketch.models.CGPoint import CGPoint
+from sketch.models.SlottedObject import SlottedObject
 
 
-class MSRect(object):
+class MSRect(SlottedObject):
     """
     Represents a size and position of a layer on the screen. See MSLayer for more information
     """
+    __slots__ = ("_x", "_y", "_width", "_height", "_owner")
+
     def __init__(self, x, y, width, height):
         self._x = float(x)
         self._y = float(y)
         self._width = float(width)
         self._height = float(height)
 
+        # The layer this is the frame of, told about changes so it can drop cached geometry
+        self._owner = None
+
+    def _changed(self):
+        if self._owner is not None:
+            self._owner._frameChanged()
+
     """
     Base attributes. All floats
     """
@@ -35,27 +45,35 @@ class MSRect(object):
     """
     def addX(self, x):
         self._x += x
+        self._changed()
 
     def addY(self, y):
         self._y += y
+        self._changed()
 
     def addWidth(self, width):
         self._width += width
+        self._changed()
 
     def addHeight(self, height):
         self._height += height
+        self._changed()
 
     def subtractX(self, x):
         self._x -= x
+        self._changed()
 
     def subtractY(self, y):
         self._y -= y
+        self._changed()
 
     def subtractWidth(self, width):
         self._width -= width
+        self._changed()
 
     def subtractHeight(self, height):
         self._height -= height
+        self._changed()
 
     """
     For each axis the minimum, middle and maximum of the rectangle. All floats
@@ -1,19 +1,69 @@
+import numpy as np
+
 from sketch.models.MSCurvePoint import MSCurvePoint
+from sketch.models.SlottedObject import SlottedObject
+
+
+class MSShapePath(SlottedObject):
+    """
+    A path of curve points, held as arrays rather than one object per point:
+
+        coordinates   float (N, 3, 2): for each point its point, curveFrom and curveTo (x, y)
+        curveModes    int (N,)
+        cornerRadii   float (N,)
 
+    `points` gives the familiar MSCurvePoint objects as views of these arrays.
+    """
+    __slots__ = ("_coordinates", "_curveModes", "_cornerRadii", "_isClosed")
 
-class MSShapePath(object):
     def __init__(self, points, isClosed):
         assert isinstance(points, list)
         for point in points:
             assert isinstance(point, MSCurvePoint)
-        self._points = points
+
+        self._coordinates = np.array([point._coordinates[point._index] for point in points],
+                                     dtype=np.float64).reshape(len(points), 3, 2)
+        self._curveModes = np.array([point.curveMode for point in points], dtype=np.int64)
+        self._cornerRadii = np.array([point.cornerRadius for point in points], dtype=np.float64)
 
         assert isinstance(isClosed, bool)
         self._isClosed = isClosed
 
+    @classmethod
+    def from_arrays(cls, coordinates, curveModes, cornerRadii, isClosed):
+        """
+        Builds a path straight from its arrays, without intermediate MSCurvePoints.
+        :param coordinates: (N, 3, 2) point, curveFrom and curveTo coordinates
+        :param curveModes: N curve modes
+        :param cornerRadii: N corner radii
+        """
+        path = cls.__new__(cls)
+        path._coordinates = np.asarray(coordinates, dtype=np.float64).reshape(-1, 3, 2)
+        path._curveModes = np.asarray(curveModes, dtype=np.int64)
+        path._cornerRadii = np.asarray(cornerRadii, dtype=np.float64)
+        assert len(path._curveModes) == len(path._cornerRadii) == len(path._coordinates)
+
+        assert isinstance(isClosed, bool)
+        path._isClosed = isClosed
+        return path
+
+    @property
+    def coordinates(self):
+        return self._coordinates
+
+    @property
+    def curveModes(self):
+        return self._curveModes
+
+    @property
+    def cornerRadii(self):
+        return self._cornerRadii
+
     @property
     def points(self):
-        return self._points
+        """ The path's MSCurvePoints: views that read and write the path's arrays """
+        return [MSCurvePoint.view(self._coordinates, self._curveModes, self._cornerRadii, index)
+                for index in range(len(self._coordinates))]
 
     @property
     def isClosed(self):
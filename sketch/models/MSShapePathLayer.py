@@ -1,16 +1,25 @@
 from itertools import chain
 
+import numpy as np
+
 from sketch.drawing.shapes import shape_element
+from sketch.models.MSCurvePoint import (
+    CURVE_FROM,
+    CURVE_TO,
+    POINT
+)
 from sketch.models.MSLayer import MSLayer
 from sketch.models.MSShapePath import MSShapePath
-from sketch.utils import pairwise
 
 
 class MSShapePathLayer(MSLayer):
+    __slots__ = ("_path", "_booleanOperation")
+
     def __init__(self, path, booleanOperation,
                  frame, style, name, rotation,
                  isVisible, isLocked,
-                 isFlippedHorizontal, isFlippedVertical):
+                 isFlippedHorizontal, isFlippedVertical,
+                 objectID=None):
 
         assert isinstance(path, MSShapePath)
         self._path = path
@@ -20,7 +29,8 @@ class MSShapePathLayer(MSLayer):
 
         super(MSShapePathLayer, self).__init__(frame, style, name, rotation,
                                                isVisible, isLocked,
-                                               isFlippedHorizontal, isFlippedVertical)
+                                               isFlippedHorizontal, isFlippedVertical,
+                                               objectID=objectID)
 
     @property
     def path(self):
@@ -39,23 +49,19 @@ class MSShapePathLayer(MSLayer):
 
     def _bezier_curves(self):
         """
-        :returns a list of bezier_pts that define the entire shape path.
-        each bezier_pt is itself a list of four (x,y) tuples specifying
-        the points of an individual bezier curve of the path.
+        :returns an (M, 4, 2) array of the bezier curves that define the entire
+        shape path: for each curve its start point, two control points and end
+        point as (x, y), scaled to the layer's frame.
         """
-        def _bezier_pts(start, end):
-            bezier_pts = [(start.point.x, start.point.y), (start.curveFrom.x, start.curveFrom.y),
-                          (end.curveTo.x, end.curveTo.y), (end.point.x, end.point.y)]
-            return [((x * self.frame.width), (y * self.frame.height)) for (x, y) in bezier_pts]
-
-        bezier_curves = []
-        for _curr, _next in pairwise(self.path.points):
-            bezier_curves.append(_bezier_pts(_curr, _next))
-
-        if self.path.isClosed and len(self.path.points) >= 1:
-            bezier_curves.append(_bezier_pts(self.path.points[-1], self.path.points[0]))
+        coordinates = self.path.coordinates
+        if self.path.isClosed:
+            # The last point joins back up with the first
+            starts, ends = coordinates, np.roll(coordinates, -1, axis=0)
+        else:
+            starts, ends = coordinates[:-1], coordinates[1:]
 
-        return bezier_curves
+        curves = np.concatenate([starts[:, [POINT, CURVE_FROM]], ends[:, [CURVE_TO, POINT]]], axis=1)
+        return curves * (self.frame.width, self.frame.height)
 
     def to_cairo(self):
         """
@@ -75,20 +81,20 @@ class MSShapePathLayer(MSLayer):
 ##############################################################
 
 class MSRectangleShape(MSShapePathLayer):
-    pass
+    __slots__ = ()
 
 
 class MSStarShape(MSShapePathLayer):
-    pass
+    __slots__ = ()
 
 
 class MSPolygonShape(MSShapePathLayer):
-    pass
+    __slots__ = ()
 
 
 class MSOvalShape(MSShapePathLayer):
-    pass
+    __slots__ = ()
 
 
 class MSTriangleShape(MSShapePathLayer):
-    pass
+    __slots__ = ()
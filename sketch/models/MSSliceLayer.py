@@ -1,4 +1,5 @@
-from sketch.models import MSLayer
+# -*- coding: utf-8 -*-
+from sketch.models.MSLayer import MSLayer
 
 
 class MSSliceLayer(MSLayer):
@@ -9,4 +10,4 @@ class MSSliceLayer(MSLayer):
     MSSliceLayer has —like MSLayer— a frame property that is an
     MSRect which determines its position in the canvas or inside its artboard.
     """
-    pass
+    __slots__ = ()
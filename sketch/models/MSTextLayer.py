@@ -5,12 +5,16 @@ class MSTextLayer(MSLayer):
     """
     Represents text. Only the most basic of properties have yet been exposed.
     """
+    __slots__ = ("text", "usesNewLineSpacingBehaviour", "textBehaviour",
+                 "heightIsClipped", "automaticallyDrawOnUnderlyingPath")
+
     def __init__(self, text,
                  usesNewLineSpacingBehaviour, textBehaviour,
                  heightIsClipped, automaticallyDrawOnUnderlyingPath,
                  frame, style, name, rotation,
                  isVisible, isLocked,
-                 isFlippedHorizontal, isFlippedVertical):
+                 isFlippedHorizontal, isFlippedVertical,
+                 objectID=None):
 
         assert isinstance(text, basestring)
         self.text = text
@@ -29,7 +33,8 @@ class MSTextLayer(MSLayer):
 
         super(MSTextLayer, self).__init__(frame, style, name, rotation,
                                           isVisible, isLocked,
-                                          isFlippedHorizontal, isFlippedVertical)
+                                          isFlippedHorizontal, isFlippedVertical,
+                                          objectID=objectID)
 
     @property
     def fontSize(self):
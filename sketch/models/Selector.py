@@ -0,0 +1,230 @@
+import re
+
+from sketch.models.LayerTable import _layer_values
+from sketch.models.MSLayer import MSLayer
+from sketch.models.MSLayerGroup import MSLayerGroup
+
+
+_TOKEN = re.compile(r"""
+    (?P<child>\s*>\s*)
+  | (?P<descendant>\s+)
+  | (?P<type>[A-Za-z_]\w*|\*)
+  | \#(?P<id>[\w-]+)
+  | \[\s*(?P<attribute>[A-Za-z_]\w*)\s*
+        (?:(?P<operator>[\^$*!]?=)\s*(?P<value>"[^"]*"|'[^']*'|[^\]]*?)\s*)?\]
+  | :(?P<pseudo>[\w-]+)
+""", re.VERBOSE)
+
+_OPERATORS = {
+    "=": lambda actual, value: actual == value,
+    "!=": lambda actual, value: actual != value,
+    "^=": lambda actual, value: actual.startswith(value),
+    "$=": lambda actual, value: actual.endswith(value),
+    "*=": lambda actual, value: value in actual,
+}
+
+_PSEUDO_CLASSES = {
+    "visible": lambda node: node.flags[0],
+    "hidden": lambda node: not node.flags[0],
+    "locked": lambda node: node.flags[1],
+    "unlocked": lambda node: not node.flags[1],
+}
+
+CHILD, DESCENDANT = ">", " "
+
+
+class Selector(object):
+    """
+    A CSS-like selector over the layer tree, compiled once into a predicate per
+    compound selector and evaluated over the pages by a generator (see
+    MSDocumentData.select):
+
+        MSPage[name=Home] MSLayerGroup:visible > MSTextLayer[name^=Title]
+
+    Compound selectors are a class or * followed by any of #objectID,
+    [attribute], [attribute=value] (also !=, ^=, $= and *=) and the pseudo classes
+    :visible, :hidden, :locked and :unlocked, joined by descendant (space) or child
+    (>) combinators. A class matches the layers that go by it (see layer_classnames()):
+    its subclasses too, and layers archived with it as $classname, e.g. MSLayerGroup
+    matches a group archived as an MSShapeGroup and MSShapePathLayer an MSOvalShape,
+    which MSOvalShape matches too. Layers left unconverted match their $classname.
+    Attributes are compared as text, booleans as "true" or "false".
+
+    Matches are yielded in document order. Subtrees that cannot hold a match, e.g.
+    other pages when the selector starts with MSPage[...], are not walked.
+    """
+
+    def __init__(self, selector):
+        self.selector = selector
+        self.compounds = []
+        self.combinators = []
+
+        position = 0
+        combinator = None
+        compound = None
+        selector = selector.strip()
+        while position < len(selector):
+            match = _TOKEN.match(selector, position)
+            if match is None or match.end() == position:
+                raise ValueError("Invalid selector {0!r} at {1}".format(self.selector, position))
+            position = match.end()
+            kind = next(kind for kind in ("child", "descendant", "type", "id", "attribute", "pseudo")
+                        if match.group(kind) is not None)
+
+            if kind in ("child", "descendant"):
+                if compound is None:
+                    raise ValueError("Invalid selector {0!r} at {1}".format(self.selector, match.start()))
+                combinator = CHILD if kind == "child" else DESCENDANT
+                self.compounds.append(compound)
+                compound = None
+                continue
+
+            if compound is None:
+                compound = _Compound()
+                self.combinators.append(combinator)
+                combinator = None
+            if kind == "type":
+                if compound.predicates or compound.classname is not None:
+                    raise ValueError("Invalid selector {0!r}: a class must come first".format(self.selector))
+                compound.classname = match.group("type")
+            compound.add(kind, match)
+
+        if compound is None:
+            raise ValueError("Invalid selector {0!r}".format(self.selector))
+        self.compounds.append(compound)
+
+        # Pages are never nested, so a selector starting with one can only match under matching pages
+        self._anchored = self.compounds[0].classname == "MSPage"
+
+    def select(self, pages):
+        """ Yields the layers, and pages, matching the selector, in document order """
+        last = len(self.compounds) - 1
+        # Each entry: a node, the compounds matched along its ancestors, those matched by its parent
+        stack = [(page, frozenset(), frozenset()) for page in reversed(list(pages))]
+        while stack:
+            layer, ancestors, parent = stack.pop()
+            node = _Node(layer)
+
+            matched = set()
+            for index, compound in enumerate(self.compounds):
+                if index == 0:
+                    reachable = True
+                elif self.combinators[index] == CHILD:
+                    reachable = index - 1 in parent
+                else:
+                    reachable = index - 1 in ancestors
+                if reachable and compound.matches(node):
+                    matched.add(index)
+            if last in matched:
+                yield layer
+
+            if not node.children:
+                continue
+            descendants = ancestors.union(matched)
+            if self._anchored and not self._useful(descendants, matched):
+                continue
+            matched = frozenset(matched)
+            for child in MSLayerGroup._reversed_layers(node.children):
+                stack.append((child, descendants, matched))
+
+    @property
+    def is_simple(self):
+        """ True for a single compound selector, which looks at nothing but the layer itself """
+        return len(self.compounds) == 1
+
+    def filter(self, layers):
+        """ Yields the given layers that match a simple selector """
+        assert self.is_simple
+        compound = self.compounds[0]
+        for layer in layers:
+            if compound.matches(_Node(layer)):
+                yield layer
+
+    def _useful(self, ancestors, parent):
+        """ Whether children could get further along the selector than its first compound """
+        for index in range(1, len(self.compounds)):
+            if index - 1 in (parent if self.combinators[index] == CHILD else ancestors):
+                return True
+        return False
+
+    def __repr__(self):
+        return "<Selector {0!r}>".format(self.selector)
+
+
+class _Compound(object):
+    """ One compound selector: an optional class and predicates on a _Node """
+
+    def __init__(self):
+        self.classname = None
+        self.objectID = None
+        self.predicates = []
+
+    def add(self, kind, match):
+        if kind == "id":
+            self.objectID = match.group("id")
+            self.predicates.append(lambda node, objectID=self.objectID: node.objectID == objectID)
+        elif kind == "attribute":
+            self.predicates.append(_attribute_predicate(match.group("attribute"), match.group("operator"),
+                                                        match.group("value")))
+        elif kind == "pseudo":
+            if match.group("pseudo") not in _PSEUDO_CLASSES:
+                raise ValueError("Unknown pseudo class :{0}".format(match.group("pseudo")))
+            self.predicates.append(_PSEUDO_CLASSES[match.group("pseudo")])
+
+    def matches(self, node):
+        if self.classname not in (None, "*") and self.classname not in node.classnames:
+            return False
+        for predicate in self.predicates:
+            if not predicate(node):
+                return False
+        return True
+
+
+def _attribute_predicate(attribute, operator, value):
+    if operator is None:
+        return lambda node: node.attribute(attribute) is not None
+
+    if value[:1] in ("'", '"'):
+        value = value[1:-1]
+    compare = _OPERATORS[operator]
+
+    def predicate(node):
+        actual = node.attribute(attribute)
+        if actual is None:
+            return operator == "!="
+        if isinstance(actual, bool):
+            actual = "true" if actual else "false"
+        return compare(unicode(actual), value)
+    return predicate
+
+
+class _Node(object):
+    """ What selectors look at in a layer, converted or not """
+    __slots__ = ("layer", "classnames", "objectID", "name", "flags", "children")
+
+    def __init__(self, layer):
+        self.layer = layer
+        classname, self.objectID, self.name, frame, rotation, self.flags, self.children = _layer_values(layer)
+        self.classnames = layer._classnames() if isinstance(layer, MSLayer) else (classname,)
+
+    def attribute(self, attribute):
+        if attribute == "objectID":
+            return self.objectID
+        if attribute == "name":
+            return self.name
+        if isinstance(self.layer, MSLayer):
+            return getattr(self.layer, attribute, None)
+        return self.layer.get(attribute)
+
+
+_compiled = {}
+
+
+def compile_selector(selector):
+    """ The Selector for a selector string, compiled once and then reused """
+    compiled = _compiled.get(selector)
+    if compiled is None:
+        if len(_compiled) >= 256:
+            _compiled.clear()
+        compiled = _compiled[selector] = Selector(selector)
+    return compiled
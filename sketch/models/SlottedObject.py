@@ -0,0 +1,22 @@
+class SlottedObject(object):
+    """
+    Base for model classes that keep their attributes in __slots__ rather than a
+    per-instance __dict__. Subclasses list the attributes they add in their own
+    __slots__ (an empty tuple if none).
+
+    Pickle protocol 2 handles slots by itself; __getstate__/__setstate__ keep
+    protocols 0 and 1 working too.
+    """
+    __slots__ = ()
+
+    def __getstate__(self):
+        state = dict(getattr(self, "__dict__", ()))
+        for cls in type(self).__mro__:
+            for name in cls.__dict__.get("__slots__", ()):
+                if name not in state and hasattr(self, name):
+                    state[name] = getattr(self, name)
+        return state
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
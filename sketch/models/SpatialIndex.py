@@ -0,0 +1,136 @@
+import heapq
+
+import numpy as np
+
+
+class SpatialIndex(object):
+    """
+    A packed bounding volume hierarchy over axis aligned boxes, bulk loaded with
+    Sort-Tile-Recursive: boxes are sorted into vertical slices by their centers'
+    x, each slice by y, and grouped node_size at a time into nodes, which are
+    grouped in turn up to a root level of at most node_size nodes. Queries walk
+    down the levels testing whole arrays of nodes at once. See MSPage.spatial_index.
+
+    :param boxes: (N, 4) minX, minY, maxX, maxY
+    :param items: The N objects the boxes belong to, returned by queries
+    :param node_size: The number of children of each node
+    """
+
+    def __init__(self, boxes, items, node_size=16):
+        boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        self.items = list(items)
+        assert len(self.items) == len(boxes)
+
+        # Each level is (boxes, starts, ends): the children of node i of a level are
+        # nodes starts[i]:ends[i] of the level below. Leaves have no children.
+        self._order = _str_order(boxes, node_size)
+        levels = [(boxes[self._order], None, None)]
+        while len(levels[-1][0]) > node_size:
+            children = levels[-1][0]
+            starts = np.arange(0, len(children), node_size)
+            ends = np.minimum(starts + node_size, len(children))
+            nodes = np.column_stack([np.minimum.reduceat(children[:, 0], starts),
+                                     np.minimum.reduceat(children[:, 1], starts),
+                                     np.maximum.reduceat(children[:, 2], starts),
+                                     np.maximum.reduceat(children[:, 3], starts)])
+            order = _str_order(nodes, node_size)
+            levels.append((nodes[order], starts[order], ends[order]))
+        self._levels = levels[::-1]
+
+    def __len__(self):
+        return len(self.items)
+
+    @property
+    def bounds(self):
+        """ minX, minY, maxX, maxY around every box, or None if the index is empty """
+        if not self.items:
+            return None
+        boxes = self._levels[0][0]
+        return (boxes[:, 0].min(), boxes[:, 1].min(), boxes[:, 2].max(), boxes[:, 3].max())
+
+    def at(self, x, y):
+        """ The items whose boxes contain the point (x, y) """
+        return self.intersecting(x, y, x, y)
+
+    def intersecting(self, minX, minY, maxX, maxY):
+        """ The items whose boxes intersect the given box, edges included """
+        def test(boxes):
+            return (boxes[:, 0] <= maxX) & (boxes[:, 2] >= minX) & (boxes[:, 1] <= maxY) & (boxes[:, 3] >= minY)
+        return self._search(test, test)
+
+    def contained_in(self, minX, minY, maxX, maxY):
+        """ The items whose boxes lie entirely inside the given box """
+        def intersects(boxes):
+            return (boxes[:, 0] <= maxX) & (boxes[:, 2] >= minX) & (boxes[:, 1] <= maxY) & (boxes[:, 3] >= minY)
+
+        def inside(boxes):
+            return (boxes[:, 0] >= minX) & (boxes[:, 2] <= maxX) & (boxes[:, 1] >= minY) & (boxes[:, 3] <= maxY)
+        return self._search(intersects, inside)
+
+    def _search(self, node_test, leaf_test):
+        """ The items of the leaves passing leaf_test under nodes passing node_test, in item order """
+        if not self.items:
+            return []
+
+        nodes = np.arange(len(self._levels[0][0]))
+        for boxes, starts, ends in self._levels:
+            if starts is None:
+                leaves = nodes[leaf_test(boxes[nodes])]
+                break
+            hits = nodes[node_test(boxes[nodes])]
+            nodes = _ranges(starts[hits], ends[hits])
+        return [self.items[index] for index in np.sort(self._order[leaves])]
+
+    def nearest(self, x, y, count=1):
+        """
+        The count items whose boxes are nearest to the point (x, y), nearest first,
+        as (distance, item) pairs. The distance of a box containing the point is 0.
+        """
+        if not self.items:
+            return []
+
+        heap = [(distance, 0, node) for node, distance in enumerate(_distances(self._levels[0][0], x, y))]
+        heapq.heapify(heap)
+        nearest = []
+        # Best first: a node is never nearer than its children, so leaves come off the heap in order
+        while heap and len(nearest) < count:
+            distance, level, node = heapq.heappop(heap)
+            boxes, starts, ends = self._levels[level]
+            if starts is None:
+                nearest.append((distance, self.items[self._order[node]]))
+                continue
+            children = np.arange(starts[node], ends[node])
+            for child, child_distance in zip(children, _distances(self._levels[level + 1][0][children], x, y)):
+                heapq.heappush(heap, (child_distance, level + 1, child))
+        return nearest
+
+    def __repr__(self):
+        return "<SpatialIndex {0} boxes, {1} levels>".format(len(self), len(self._levels))
+
+
+def _str_order(boxes, node_size):
+    """ The Sort-Tile-Recursive order of boxes: slices by center x, each sorted by center y """
+    count = len(boxes)
+    if count <= node_size:
+        return np.arange(count)
+
+    centers_x = boxes[:, 0] + boxes[:, 2]
+    centers_y = boxes[:, 1] + boxes[:, 3]
+    slices = int(np.ceil(np.sqrt(np.ceil(count / float(node_size)))))
+    slice_of = np.empty(count, dtype=np.int64)
+    slice_of[np.argsort(centers_x, kind="mergesort")] = np.arange(count) // (slices * node_size)
+    return np.lexsort((centers_y, slice_of))
+
+
+def _ranges(starts, ends):
+    """ The concatenation of np.arange(start, end) for each start, end pair """
+    counts = ends - starts
+    offsets = np.repeat(starts - np.cumsum(counts) + counts, counts)
+    return np.arange(counts.sum()) + offsets
+
+
+def _distances(boxes, x, y):
+    """ The distances from (x, y) to each box, 0 inside it """
+    dx = np.maximum(np.maximum(boxes[:, 0] - x, x - boxes[:, 2]), 0)
+    dy = np.maximum(np.maximum(boxes[:, 1] - y, y - boxes[:, 3]), 0)
+    return np.hypot(dx, dy).tolist()
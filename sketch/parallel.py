@@ -0,0 +1,152 @@
+"""
+Reads many Sketch documents in parallel across a pool of worker processes
+"""
+import itertools
+import multiprocessing
+import os
+import traceback
+from collections import namedtuple
+from multiprocessing.queues import SimpleQueue
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+import sketch
+from sketch.report import ReadReport
+
+
+class ReadResult(namedtuple("ReadResult", ["filename", "document", "error", "report"])):
+    """
+    The outcome of reading one file with read_many. On success `document` is the
+    MSDocumentData and `error` is None; on failure `document` is None and `error`
+    holds the formatted exception. `report` is the file's ReadReport when
+    read_many was asked for reports, None otherwise.
+    """
+    def __new__(cls, filename, document, error, report=None):
+        return super(ReadResult, cls).__new__(cls, filename, document, error, report)
+
+
+# Set in each worker by _init_worker: where workers say which task they are running
+_started = None
+
+
+def _init_worker(started):
+    global _started
+    _started = started
+
+
+def _read_one(task, filename, read_kwargs):
+    """
+    Runs in a worker: fetches, decodes and converts one document. The result is
+    pickled here so that failures to pickle a document are reported like any
+    other per-file error.
+    """
+    _started.put((task, os.getpid()))
+    read_kwargs = dict(read_kwargs)
+    report = read_kwargs["report"] = ReadReport(filename) if read_kwargs.get("report") else None
+    try:
+        result = ReadResult(filename, sketch.read(filename, **read_kwargs), None, report)
+        return task, pickle.dumps(result, pickle.HIGHEST_PROTOCOL)
+    except Exception:
+        result = ReadResult(filename, None, traceback.format_exc(), report)
+        return task, pickle.dumps(result, pickle.HIGHEST_PROTOCOL)
+
+
+def read_many(filenames, workers=None, max_pending=None, poll_interval=0.5, **read_kwargs):
+    """
+    Reads and parses Sketch documents across a pool of worker processes.
+
+    Yields a ReadResult per file in completion order. Errors in individual files
+    are reported through ReadResult.error instead of being raised, and so is a
+    worker process dying while reading a file (e.g. killed for running out of
+    memory): the pool replaces the worker and the other files carry on. At most
+    max_pending files (twice the number of workers by default) are in flight at
+    once, so memory stays flat however many filenames are given.
+
+    Documents travel back to the parent process on their own: data is copied out
+    of the payload (copy_data=True) unless asked otherwise, and whatever a lazy
+    read left unconverted is converted when the document is pickled.
+
+    :param filenames: Any iterable of filenames; it is consumed lazily
+    :param workers: Number of worker processes, the number of CPUs by default
+    :param max_pending: Maximum number of files submitted but not yet yielded
+    :param poll_interval: Seconds between checks for dead workers while waiting
+    :param read_kwargs: Passed on to sketch.read() for each file, e.g. mode, lazy,
+                        pages, layer_classes or max_depth. With report=True each
+                        file is read with a ReadReport of its own, returned in
+                        ReadResult.report.
+    """
+    workers = workers or multiprocessing.cpu_count()
+    read_kwargs.setdefault("copy_data", True)
+    max_pending = max_pending or 2 * workers
+
+    filenames = iter(filenames)
+    completed = queue.Queue()
+    # Written to synchronously, so the message is out even if the worker dies right after
+    started = SimpleQueue()
+    # Tasks submitted but not yielded, as task: filename, and the worker running each
+    pending = {}
+    running = {}
+    suspects = set()
+    tasks = itertools.count()
+    exhausted = False
+
+    pool = multiprocessing.Pool(workers, _init_worker, (started,))
+    try:
+        while True:
+            while not exhausted and len(pending) < max_pending:
+                try:
+                    filename = next(filenames)
+                except StopIteration:
+                    exhausted = True
+                    break
+                task = next(tasks)
+                pending[task] = filename
+                pool.apply_async(_read_one, (task, filename, read_kwargs), callback=completed.put)
+
+            if not pending:
+                break
+
+            try:
+                task, payload = completed.get(timeout=poll_interval)
+            except queue.Empty:
+                for task in _lost_tasks(started, pending, running, suspects):
+                    yield ReadResult(pending.pop(task), None,
+                                     "Worker process {0} exited while reading the file".format(running.pop(task)))
+                continue
+
+            if pending.pop(task, None) is not None:
+                running.pop(task, None)
+                suspects.discard(task)
+                yield pickle.loads(payload)
+
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def _lost_tasks(started, pending, running, suspects):
+    """
+    The pending tasks whose worker is gone. A task is only reported once it has
+    been found without a worker twice in a row, as a result sent just before the
+    worker exited may still be on its way.
+    """
+    while not started.empty():
+        task, pid = started.get()
+        if task in pending:
+            running[task] = pid
+
+    alive = set(process.pid for process in multiprocessing.active_children())
+    orphans = set(task for task, pid in running.items() if pid not in alive)
+    lost = orphans & suspects
+    suspects.clear()
+    suspects.update(orphans - lost)
+    return sorted(lost)
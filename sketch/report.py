@@ -0,0 +1,87 @@
+"""
+Instrumentation of the read path: where the time of a sketch.read() goes.
+
+    report = ReadReport()
+    document = sketch.read(filename, report=report)
+    print report.stages            # {"fetch": ..., "decode": ..., "convert": ...}
+    report.write_jsonl("reads.jsonl")
+"""
+import contextlib
+import json
+import time
+from collections import OrderedDict
+from timeit import default_timer
+
+from sketch.bplist import DecodeStats
+from sketch.converter import ConversionStats
+
+
+class ReadReport(object):
+    """
+    Collects instrumentation for one read: the seconds spent in each stage,
+    the bplist decoder's counters (including objects by type) and converter
+    invocations and time by $classname.
+
+    Stages are "fetch" (the payload out of SQLite), "decode" (bplist), "convert"
+    (building models) and, for reads served by a DocumentCache, "cache". In the
+    default lazy conversion mode, conversions done after sketch.read() returns
+    keep counting into the report but not into the "convert" stage.
+    """
+    def __init__(self, filename=None):
+        self.filename = filename
+        self.created = time.time()
+        self.stages = OrderedDict()
+        self.decoding = DecodeStats()
+        self.conversion = ConversionStats(per_class=True)
+
+    @property
+    def total_seconds(self):
+        return sum(self.stages.values())
+
+    def to_dict(self):
+        """ The report as a JSON serializable dict """
+        classes = dict((classname, {"count": count, "seconds": self.conversion.class_seconds[classname]})
+                       for classname, count in self.conversion.class_counts.items())
+        return {
+            "filename": self.filename,
+            "created": self.created,
+            "stages": dict(self.stages),
+            "total_seconds": self.total_seconds,
+            "objects_decoded": self.decoding.objects_decoded,
+            "decodes_avoided": self.decoding.decodes_avoided,
+            "strings_shared": self.decoding.strings_shared,
+            "object_types": self.decoding.object_types,
+            "conversions": self.conversion.conversions,
+            "cache_hits": self.conversion.cache_hits,
+            "classes": classes,
+        }
+
+    def write_jsonl(self, f):
+        """
+        Appends the report as a line of JSON.
+        :param f: A filename, or a file-like object open for writing text
+        """
+        line = json.dumps(self.to_dict(), sort_keys=True) + "\n"
+        if hasattr(f, "write"):
+            f.write(line)
+        else:
+            with open(f, "a") as out:
+                out.write(line)
+
+    def __repr__(self):
+        return "<ReadReport {0} {1}>".format(
+            self.filename, " ".join("{0}: {1:.4f}s".format(name, seconds) for name, seconds in self.stages.items()))
+
+
+@contextlib.contextmanager
+def stage(report, name):
+    """ Times the enclosed block as stage `name` of report; does nothing if report is None """
+    if report is None:
+        yield
+        return
+
+    start = default_timer()
+    try:
+        yield
+    finally:
+        report.stages[name] = report.stages.get(name, 0.0) + default_timer() - start
@@ -0,0 +1,15 @@
+import os
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def fixture(name):
+    """ The path of one of the example documents in Sketch Experiments/ """
+    return os.path.join(_ROOT, "Sketch Experiments", name)
+
+
+# Example documents every model test runs against
+DOCUMENTS = ("allshapes.sketch", "Shapes.sketch", "rectangle.sketch", "rectanglestyle.sketch")
+
+# A document with text layers, whose storage refers back to them
+TEXT_DOCUMENT = os.path.join(_ROOT, "data", "test.sketch")
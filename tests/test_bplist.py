@@ -0,0 +1,147 @@
+import datetime
+import io
+import struct
+import unittest
+
+import sketch
+from sketch import bplist
+from tests import DOCUMENTS, TEXT_DOCUMENT, fixture
+
+_TRAILER_FIELDS = ("offset_int_size", "ref_size", "object_count", "top_object", "offset_table_offset")
+
+
+def _encode(obj):
+    f = io.BytesIO()
+    bplist.write(obj, f)
+    return bytearray(f.getvalue())
+
+
+def _with_trailer(data, **fields):
+    """ data with some of its trailer fields replaced """
+    values = dict(zip(_TRAILER_FIELDS, struct.unpack(">6xBBQQQ", bytes(data[-32:]))))
+    values.update(fields)
+    data[-32:] = struct.pack(">6xBBQQQ", *[values[name] for name in _TRAILER_FIELDS])
+    return data
+
+
+def _nested_arrays(depth):
+    """ A payload of depth arrays, each holding the next; the innermost is empty """
+    objects = [struct.pack(">BH", 0xA1, index + 1) for index in range(depth)] + [b"\xa0"]
+    offsets = [8 + 3 * index for index in range(depth + 1)]
+    offset_table_offset = offsets[-1] + 1
+    return (b"bplist00" + b"".join(objects) + struct.pack(">{0}I".format(len(offsets)), *offsets) +
+            struct.pack(">6xBBQQQ", 4, 2, len(offsets), 0, offset_table_offset))
+
+
+def _plain(obj):
+    """ obj with lazy containers, UIDs and data made comparable """
+    if isinstance(obj, (dict, bplist.LazyDict)):
+        return dict((_plain(key), _plain(value)) for key, value in obj.items())
+    if isinstance(obj, (list, bplist.LazyArray)):
+        return [_plain(item) for item in obj]
+    if isinstance(obj, bplist.UID):
+        return ("UID", obj.value)
+    if isinstance(obj, memoryview):
+        return obj.tobytes()
+    if isinstance(obj, bytearray):
+        return bytes(obj)
+    return obj
+
+
+class DecodeTest(unittest.TestCase):
+
+    def test_round_trip(self):
+        obj = {u"text": u"abc", u"unicode": u"\u00e9t\u00e9", u"none": None, u"flags": [True, False],
+               u"ints": [0, 255, -1, 1 << 20, -(1 << 40)], u"real": 1.5, u"data": b"\x00\x01\xff",
+               u"date": datetime.datetime(2015, 6, 1, 12, 30), u"uid": bplist.UID(7),
+               u"nested": [{u"a": [u"abc", []]}, {}]}
+        f = io.BytesIO()
+        bplist.write(obj, f)
+        expected = _plain(obj)
+        self.assertEqual(_plain(bplist.read(f)), expected)
+        for lazy in (False, True):
+            for copy_data in (False, True):
+                self.assertEqual(_plain(bplist.read_buffer(f.getvalue(), lazy=lazy, copy_data=copy_data)), expected)
+
+    def test_fixtures_decode_alike(self):
+        for filename in [fixture(name) for name in DOCUMENTS + ("simpleai_cs6.sketch",)] + [TEXT_DOCUMENT]:
+            payload = bytes(sketch._fetch_plist(filename))
+            decoded = bplist.read(io.BytesIO(payload))
+            expected = _plain(decoded)
+            for lazy in (False, True):
+                self.assertEqual(_plain(bplist.read_buffer(payload, lazy=lazy)), expected, (filename, lazy))
+            f = io.BytesIO()
+            bplist.write(decoded, f)
+            self.assertEqual(_plain(bplist.read_buffer(f.getvalue())), expected, filename)
+
+    def test_deep_nesting(self):
+        # Far deeper than the interpreter's recursion limit
+        data = _nested_arrays(20000)
+        for read in (lambda: bplist.read_buffer(data), lambda: bplist.read(io.BytesIO(data))):
+            result, depth = read(), 0
+            while result:
+                result, depth = result[0], depth + 1
+            self.assertEqual(depth, 20000)
+        bplist.read_buffer(data, max_depth=20000)
+        self.assertRaises(bplist.DataIntegrityError, bplist.read_buffer, data, max_depth=19999)
+        self.assertRaises(bplist.DataIntegrityError, bplist.read, io.BytesIO(data), max_depth=100)
+
+    def test_object_budget(self):
+        data = _nested_arrays(10)
+        bplist.read_buffer(data, max_objects=11)
+        self.assertRaises(bplist.DataIntegrityError, bplist.read_buffer, data, max_objects=10)
+        lazy = bplist.read_buffer(data, lazy=True, max_objects=5)
+        with self.assertRaises(bplist.DataIntegrityError):
+            while lazy:
+                lazy = lazy[0]
+
+
+class CorruptPayloadTest(unittest.TestCase):
+
+    def assertCorrupt(self, data):
+        for lazy in (False, True):
+            with self.assertRaises(bplist.DataIntegrityError):
+                result = bplist.read_buffer(bytes(data), lazy=lazy)
+                list(result)
+
+    def test_reference_past_the_object_table(self):
+        self.assertCorrupt(_with_trailer(_encode([u"a", u"b"]), object_count=1))
+
+    def test_top_object_past_the_object_table(self):
+        self.assertCorrupt(_with_trailer(_encode([u"a"]), top_object=9))
+
+    def test_offset_table_past_the_end(self):
+        self.assertCorrupt(_with_trailer(_encode([u"a"]), offset_table_offset=1 << 20))
+
+    def test_offset_past_the_end(self):
+        data = _encode([u"abc"])
+        offset_table_offset = struct.unpack(">Q", bytes(data[-8:]))[0]
+        data[offset_table_offset + 1] = 200
+        self.assertCorrupt(data)
+
+    def test_length_past_the_end(self):
+        data = _encode([u"abc"])
+        # The string's marker, after the header and the one element array
+        self.assertEqual(data[10], 0x53)
+        data[10] = 0x5E
+        self.assertCorrupt(data)
+
+
+class BudgetTest(unittest.TestCase):
+
+    def test_budgets_through_read(self):
+        filename = fixture("allshapes.sketch")
+        self.assertRaises(bplist.DataIntegrityError, sketch.read, filename, max_nesting=3)
+        self.assertRaises(bplist.DataIntegrityError, sketch.read, filename, max_objects=50)
+        self.assertRaises(bplist.DataIntegrityError, sketch.read, filename, lazy=True, max_objects=50)
+        document = sketch.read(filename, max_nesting=50, max_objects=100000)
+        self.assertEqual(len(list(document.walk())), 8)
+
+    def test_budgets_through_file_read(self):
+        f = io.BytesIO(bytes(sketch._fetch_plist(fixture("allshapes.sketch"))))
+        self.assertRaises(bplist.DataIntegrityError, bplist.read, f, max_depth=3)
+        self.assertRaises(bplist.DataIntegrityError, bplist.read, f, max_objects=50)
+
+
+if __name__ == "__main__":
+    unittest.main()
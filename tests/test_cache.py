@@ -0,0 +1,45 @@
+import shutil
+import tempfile
+import unittest
+
+import sketch
+from tests import TEXT_DOCUMENT, fixture
+
+
+def _layers(document):
+    return [(layer.objectID, layer.name) for layer in document.walk()]
+
+
+class DocumentCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = sketch.DocumentCache(self.directory)
+
+    def tearDown(self):
+        self.cache.close()
+        shutil.rmtree(self.directory)
+
+    def assertCachedAlike(self, filename, **read_kwargs):
+        expected = _layers(sketch.read(filename, **read_kwargs))
+        self.assertEqual(_layers(sketch.read(filename, cache=self.cache, **read_kwargs)), expected)
+        # Served from the cache this time
+        self.assertEqual(_layers(sketch.read(filename, cache=self.cache, **read_kwargs)), expected)
+
+    def test_text_document(self):
+        for read_kwargs in ({}, {"lazy": True}, {"mode": "eager"}):
+            self.assertCachedAlike(TEXT_DOCUMENT, **read_kwargs)
+        texts = [layer.text for layer in sketch.read(TEXT_DOCUMENT, cache=self.cache).walk(classes="MSTextLayer")]
+        self.assertIn(u"square\n000000, 85x85px", texts)
+
+    def test_filters_are_cached_apart(self):
+        filename = fixture("allshapes.sketch")
+        self.assertCachedAlike(filename)
+        self.assertCachedAlike(filename, max_depth=1)
+        self.assertCachedAlike(filename, layer_classes=("MSOvalShape",))
+        self.assertCachedAlike(filename, lazy=True, pages=[0], max_depth=2)
+        self.assertCachedAlike(filename)
+
+
+if __name__ == "__main__":
+    unittest.main()
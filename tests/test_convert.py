@@ -0,0 +1,69 @@
+import unittest
+
+import sketch
+from sketch import converter
+from tests import DOCUMENTS, TEXT_DOCUMENT, fixture
+
+_READS = ({}, {"lazy": True}, {"mode": "eager"}, {"lazy": True, "mode": "eager"})
+
+
+def _depth(layer):
+    """ 1 for a page's layers """
+    depth = 0
+    while layer.parentGroup() is not None:
+        layer = layer.parentGroup()
+        depth += 1
+    return depth
+
+
+def _texts(document):
+    return [(layer.objectID, layer.text) for layer in document.walk(classes="MSTextLayer")]
+
+
+class ConvertTest(unittest.TestCase):
+
+    def test_text_layers_read_in_every_mode(self):
+        expected = _texts(sketch.read(TEXT_DOCUMENT))
+        self.assertTrue(expected)
+        self.assertIn(u"square\n000000, 85x85px", [text for _, text in expected])
+        for kwargs in _READS[1:]:
+            self.assertEqual(_texts(sketch.read(TEXT_DOCUMENT, **kwargs)), expected, kwargs)
+
+
+    def test_max_depth(self):
+        document = sketch.read(fixture("allshapes.sketch"), max_depth=0)
+        self.assertEqual([page.layers for page in document.pages], [[]])
+        for max_depth in (1, 2):
+            for kwargs in _READS:
+                document = sketch.read(fixture("allshapes.sketch"), max_depth=max_depth, **kwargs)
+                self.assertEqual(max(_depth(layer) for layer in document.walk()), max_depth, kwargs)
+        self.assertRaises(ValueError, sketch.read, fixture("allshapes.sketch"), max_depth=-1)
+
+    def test_layer_classes_match_as_in_walk(self):
+        for name in DOCUMENTS + (TEXT_DOCUMENT,):
+            filename = fixture(name) if name in DOCUMENTS else name
+            for classname in ("MSShapePathLayer", "MSOvalShape", "MSShapeGroup", "MSLayer", "MSTextLayer"):
+                expected = [layer.objectID for layer in sketch.read(filename).walk(classes=classname)]
+                for kwargs in _READS:
+                    document = sketch.read(filename, layer_classes=classname, **kwargs)
+                    self.assertEqual([layer.objectID for layer in document.walk(classes=classname)], expected,
+                                     (name, classname, kwargs))
+
+
+    def test_is_checks(self):
+        def archived(classname, **keys):
+            return dict(keys, **{"$class": {"$classname": classname}})
+
+        self.assertTrue(converter.is_MSLayerGroup(archived("MSShapeGroup")))
+        self.assertTrue(converter.is_MSShapePathLayer(archived("MSOvalShape")))
+        self.assertFalse(converter.is_MSLayer(archived("MSShapeGroup")))
+        self.assertFalse(converter.is_MSLayer(None))
+        self.assertTrue(converter.is_MSArray(archived("MSArray", array_do=[])))
+        # Structural checks are the registry's
+        self.assertFalse(converter.is_MSArray(archived("MSArray")))
+        self.assertTrue(converter.is_NSString(archived("NSString", **{"NS.bytes": b"text"})))
+        self.assertFalse(converter.is_NSDate(archived("NSDate")))
+
+
+if __name__ == "__main__":
+    unittest.main()
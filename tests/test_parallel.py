@@ -0,0 +1,36 @@
+import unittest
+
+import sketch
+from tests import DOCUMENTS, TEXT_DOCUMENT, fixture
+
+
+def _layers(document):
+    return [(layer.objectID, layer.name) for layer in document.walk()]
+
+
+class ReadManyTest(unittest.TestCase):
+
+    def assertReadsAlike(self, **read_kwargs):
+        filenames = [fixture(name) for name in DOCUMENTS] + [TEXT_DOCUMENT]
+        results = list(sketch.read_many(filenames, workers=2, **read_kwargs))
+        self.assertEqual(sorted(result.filename for result in results), sorted(filenames))
+        for result in results:
+            self.assertIsNone(result.error, result.error)
+            self.assertEqual(_layers(result.document), _layers(sketch.read(result.filename, **read_kwargs)))
+
+    def test_read_options_are_forwarded(self):
+        self.assertReadsAlike()
+        self.assertReadsAlike(mode="eager")
+        self.assertReadsAlike(lazy=True)
+        self.assertReadsAlike(lazy=True, pages=[0], max_depth=1)
+        self.assertReadsAlike(layer_classes=("MSTextLayer",))
+
+    def test_reports(self):
+        results = list(sketch.read_many([fixture("rectangle.sketch")], workers=1, report=True))
+        self.assertEqual(results[0].report.filename, fixture("rectangle.sketch"))
+        self.assertIn("decode", results[0].report.stages)
+        self.assertIsNone(next(sketch.read_many([fixture("rectangle.sketch")], workers=1)).report)
+
+
+if __name__ == "__main__":
+    unittest.main()
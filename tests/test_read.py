@@ -0,0 +1,76 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import sketch
+from tests import DOCUMENTS, TEXT_DOCUMENT, fixture
+
+# Every read mode, each with and without copied data
+_READS = [dict(kwargs, copy_data=copy_data)
+          for kwargs in ({}, {"lazy": True}, {"mode": "eager"}, {"lazy": True, "mode": "eager"})
+          for copy_data in (False, True)]
+
+# allshapes.sketch as read before the fast decoder and lazy conversion
+_ALLSHAPES = [
+    ("MSPage", u"Page 1", 0.0, 0.0, 300.0, 300.0),
+    ("MSLayerGroup", u"Rectangle 1 + Line", 12.0, 285.0, 962.0, 604.0),
+    ("MSLayerGroup", u"Rectangle 1", 662.528, 256.0, 298.5, 348.0),
+    ("MSShapePathLayer", u"Path", 0.0, 0.0, 298.5, 348.0),
+    ("MSLayerGroup", u"Line", 0.0, 0.0, 171.0, 149.0),
+    ("MSShapePathLayer", u"Path", 0.0, 0.0, 171.0, 149.0),
+    ("MSLayerGroup", u"Path 3", 12.0, 38.0, 127.972, 119.873),
+    ("MSShapePathLayer", u"Path", 0.0, 0.0, 127.972, 119.873),
+]
+
+
+def _records(layer, records=None):
+    """ The layer and its descendants in document order, as class, name and frame """
+    records = [] if records is None else records
+    frame = layer.frame
+    records.append((type(layer).__name__, layer.name, round(frame.x, 3), round(frame.y, 3),
+                    round(frame.width, 3), round(frame.height, 3)))
+    for child in getattr(layer, "layers", None) or ():
+        _records(child, records)
+    return records
+
+
+def _document_records(document):
+    records = []
+    for page in document.pages:
+        _records(page, records)
+    return records
+
+
+def _paths(document):
+    return [(layer.objectID, layer.path.coordinates.tolist(), list(layer.path.curveModes), layer.path.isClosed)
+            for layer in document.walk(classes="MSShapePathLayer")]
+
+
+class ReadTest(unittest.TestCase):
+
+    def test_allshapes_as_before(self):
+        for kwargs in _READS:
+            self.assertEqual(_document_records(sketch.read(fixture("allshapes.sketch"), **kwargs)), _ALLSHAPES, kwargs)
+
+    def test_read_modes_agree(self):
+        for filename in [fixture(name) for name in DOCUMENTS] + [TEXT_DOCUMENT]:
+            document = sketch.read(filename)
+            expected = _document_records(document), _paths(document)
+            for kwargs in _READS[1:]:
+                document = sketch.read(filename, **kwargs)
+                self.assertEqual((_document_records(document), _paths(document)), expected, (filename, kwargs))
+
+    def test_missing_file(self):
+        directory = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(directory, "missing.sketch")
+            self.assertRaises(IOError, sketch.read, filename)
+            # Rather than an empty database created in its place
+            self.assertFalse(os.path.exists(filename))
+        finally:
+            shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    unittest.main()
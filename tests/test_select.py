@@ -0,0 +1,54 @@
+import unittest
+
+import sketch
+from tests import DOCUMENTS, fixture
+
+CLASSES = ("MSLayer", "MSLayerGroup", "MSShapeGroup", "MSShapePathLayer", "MSOvalShape", "MSRectangleShape", "MSPage")
+
+
+def _ids(layers):
+    return [layer.objectID for layer in layers]
+
+
+class SelectTest(unittest.TestCase):
+
+    def test_classes_match_as_in_walk(self):
+        for name in DOCUMENTS:
+            for lazy in (False, True):
+                document = sketch.read(fixture(name), lazy=lazy)
+                for classname in CLASSES:
+                    expected = _ids(document.walk(classes=classname))
+                    self.assertEqual(_ids(document.select(classname)), expected, (name, classname))
+                    # Answered from the layer table once there is one
+                    document.layer_table()
+                    self.assertEqual(_ids(document.select(classname)), expected, (name, classname))
+
+    def test_walk_select_and_layers_of_class_agree(self):
+        for name in DOCUMENTS:
+            for lazy in (False, True):
+                document = sketch.read(fixture(name), lazy=lazy)
+                for classname in CLASSES:
+                    expected = _ids(document.walk(classes=classname))
+                    self.assertEqual(_ids(document.select(classname)), expected, (name, classname))
+                    self.assertEqual(_ids(document.layers_of_class(classname)), expected, (name, classname))
+
+    def test_layers_of_class_follows_changes(self):
+        document = sketch.read(fixture("allshapes.sketch"))
+        page = document.pages[0]
+        group = next(document.walk(classes="MSShapeGroup"))
+        before = len(document.layers_of_class("MSShapeGroup"))
+        group.parentGroup().removeLayer(group)
+        self.assertEqual(len(document.layers_of_class("MSShapeGroup")), before - 1)
+        page.addLayer(group)
+        self.assertEqual(sorted(_ids(document.layers_of_class("MSShapeGroup"))),
+                         sorted(_ids(document.walk(classes="MSShapeGroup"))))
+
+    def test_archived_subclass(self):
+        document = sketch.read(fixture("rectangle.sketch"))
+        ovals = list(document.select("MSShapeGroup > MSOvalShape"))
+        self.assertTrue(ovals)
+        self.assertEqual(_ids(ovals), _ids(document.walk(classes="MSOvalShape")))
+
+
+if __name__ == "__main__":
+    unittest.main()
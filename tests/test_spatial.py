@@ -0,0 +1,63 @@
+import unittest
+
+import numpy as np
+
+import sketch
+from sketch.models.SpatialIndex import SpatialIndex
+from tests import DOCUMENTS, fixture
+
+
+def _descendants(group):
+    for layer in getattr(group, "layers", None) or ():
+        yield layer
+        for descendant in _descendants(layer):
+            yield descendant
+
+
+def _random_boxes(count, seed):
+    random = np.random.RandomState(seed)
+    corners = random.uniform(0, 1000, (count, 2))
+    sizes = random.exponential(20, (count, 2))
+    return np.column_stack([corners, corners + sizes])
+
+
+class SpatialIndexTest(unittest.TestCase):
+
+    def test_queries_match_brute_force(self):
+        for count, node_size in ((0, 16), (5, 16), (1000, 16), (1000, 4)):
+            boxes = _random_boxes(count, seed=count + node_size)
+            index = SpatialIndex(boxes, range(count), node_size=node_size)
+            random = np.random.RandomState(count)
+            for _ in range(50):
+                minX, minY = random.uniform(-50, 1000, 2)
+                maxX, maxY = minX + random.exponential(100), minY + random.exponential(100)
+                intersecting = [item for item, (x0, y0, x1, y1) in enumerate(boxes)
+                                if x0 <= maxX and x1 >= minX and y0 <= maxY and y1 >= minY]
+                inside = [item for item, (x0, y0, x1, y1) in enumerate(boxes)
+                          if x0 >= minX and x1 <= maxX and y0 >= minY and y1 <= maxY]
+                at = [item for item, (x0, y0, x1, y1) in enumerate(boxes)
+                      if x0 <= minX <= x1 and y0 <= minY <= y1]
+                self.assertEqual(index.intersecting(minX, minY, maxX, maxY), intersecting)
+                self.assertEqual(index.contained_in(minX, minY, maxX, maxY), inside)
+                self.assertEqual(index.at(minX, minY), at)
+
+                dx = np.maximum(np.maximum(boxes[:, 0] - minX, minX - boxes[:, 2]), 0) if count else []
+                dy = np.maximum(np.maximum(boxes[:, 1] - minY, minY - boxes[:, 3]), 0) if count else []
+                expected = sorted(np.hypot(dx, dy).tolist())[:3]
+                self.assertEqual([distance for distance, item in index.nearest(minX, minY, 3)], expected)
+
+    def test_page_queries_match_brute_force(self):
+        for name in DOCUMENTS:
+            for lazy in (False, True):
+                page = sketch.read(fixture(name), lazy=lazy).pages[0]
+                layers = list(_descendants(page))
+                rects = [layer.absoluteRect() for layer in layers]
+                for rect in rects:
+                    x, y = rect.x + rect.width / 2.0, rect.y + rect.height / 2.0
+                    expected = [layer.objectID for layer, other in zip(layers, rects)
+                                if other.x <= x <= other.x + other.width and other.y <= y <= other.y + other.height]
+                    self.assertEqual([layer.objectID for layer in page.layers_at(x, y)], expected, (name, lazy))
+
+
+if __name__ == "__main__":
+    unittest.main()
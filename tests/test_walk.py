@@ -0,0 +1,50 @@
+import unittest
+
+import sketch
+from sketch import converter
+from tests import DOCUMENTS, fixture
+
+
+def _rect(layer):
+    rect = layer.absoluteRect()
+    return rect.x, rect.y, rect.width, rect.height
+
+
+class WalkTest(unittest.TestCase):
+
+    def assertWalksAlike(self, filename, classes):
+        expected = [(layer.objectID, _rect(layer)) for layer in sketch.read(filename).walk(classes=classes)]
+        layers = list(sketch.read(filename, lazy=True).walk(classes=classes))
+        self.assertEqual([(layer.objectID, _rect(layer)) for layer in layers], expected)
+        for layer in layers[1:] if classes is None else layers:
+            self.assertIsNotNone(layer.parentGroup(), layer.name)
+
+    def test_lazy_walk_matches_eager(self):
+        for name in DOCUMENTS:
+            for classes in (None, "MSShapePathLayer", "MSShapeGroup", ("MSOvalShape", "MSRectangleShape")):
+                self.assertWalksAlike(fixture(name), classes)
+
+    def test_archived_classnames_come_from_the_registry(self):
+        self.assertTrue({"MSShapeGroup", "MSLayerGroup", "MSLayer"} <= converter.archived_classnames("MSShapeGroup"))
+        self.assertTrue({"MSOvalShape", "MSShapePathLayer"} <= converter.archived_classnames("MSOvalShape"))
+        self.assertEqual(converter.archived_classnames("MSBitmapLayer"), frozenset(["MSBitmapLayer"]))
+
+    def test_absolute_rect_of_walked_layer(self):
+        document = sketch.read(fixture("allshapes.sketch"), lazy=True)
+        layer = next(document.walk(classes="MSShapePathLayer"))
+        # At 0, 0 in "Rectangle 1", at 662.53, 256 in "Rectangle 1 + Line", at 12, 285 on the page
+        x, y, width, height = _rect(layer)
+        self.assertAlmostEqual(x, 674.528152, places=5)
+        self.assertAlmostEqual(y, 541.0)
+
+    def test_walked_layer_frame_change_drops_page_index(self):
+        document = sketch.read(fixture("allshapes.sketch"), lazy=True)
+        page = document.pages[0]
+        page.spatial_index()
+        layer = next(document.walk(classes="MSShapePathLayer"))
+        layer.frame.addX(1000)
+        self.assertIsNone(page._spatialIndex)
+
+
+if __name__ == "__main__":
+    unittest.main()